@@ -1,7 +1,12 @@
 import os
 import math
+import re
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
+from pathlib import Path
 from typing import Dict, Tuple, List
 
 import numpy as np
@@ -9,6 +14,7 @@ import pandas as pd
 import streamlit as st
 
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import matplotlib.pyplot as plt
 from matplotlib.patches import Ellipse, FancyArrowPatch, Rectangle
 from scipy.optimize import minimize
@@ -154,7 +160,9 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 # =========================================================
 # 1) 도메인 상수/매핑
 # =========================================================
-BUCKET_ORDER = ["3M", "6M", "1Y", "2Y", "3Y", "5Y+"]
+BUCKET_ORDER = ("3M", "6M", "1Y", "2Y", "3Y", "5Y+")
+# 정렬 키용 순위 사전 (list.index의 O(B) 탐색 대체)
+_BUCKET_RANK = {b: i for i, b in enumerate(BUCKET_ORDER)}
 
 # 버킷을 "대표 만기(년)"로 단순 치환
 BUCKET_YEARS = {"3M": 0.25, "6M": 0.5, "1Y": 1.0, "2Y": 2.0, "3Y": 3.0, "5Y+": 7.0}
@@ -186,6 +194,35 @@ else:
     DEFAULT_EXCEL_PATH = "ALM_input_template.xlsx"  # 파일이 없으면 오류 발생
 
 
+# =========================================================
+# 2-0) 워크북 캐시 (모든 load_*_from_excel이 공유)
+# =========================================================
+@st.cache_resource(show_spinner=False)
+def _load_workbook(excel_path: str, mtime: float) -> pd.ExcelFile:
+    """워크북을 한 번만 열어 ExcelFile 객체로 캐시합니다.
+
+    zip/XML 파싱은 ExcelFile 생성 시 1회만 수행되고,
+    이후 각 시트 로드는 메모리 내 워크북에서 읽습니다.
+    mtime이 캐시 키에 포함되므로 파일이 수정되면 자동 무효화됩니다.
+
+    python-calamine(러스트 기반 파서)이 설치돼 있으면 우선 사용하고,
+    없거나 pandas가 지원하지 않으면 기본 엔진(openpyxl)으로 폴백합니다.
+    """
+    try:
+        return pd.ExcelFile(excel_path, engine="calamine")
+    except (ImportError, ValueError):
+        # openpyxl 폴백: pandas가 내부적으로 read_only=True, data_only=True,
+        # keep_links=False 로 열기 때문에 스타일/조건부서식/수식 하이드레이션을
+        # 건너뛴다. data_only 특성상 다른 도구로 수식만 저장된 파일은
+        # 스프레드시트 앱에서 한 번 다시 저장해야 값이 읽힌다.
+        return pd.ExcelFile(excel_path, engine="openpyxl")
+
+
+def _get_workbook(excel_path: str) -> pd.ExcelFile:
+    """캐시된 워크북을 반환합니다 (파일 수정 시각을 캐시 키로 사용)."""
+    return _load_workbook(excel_path, os.path.getmtime(excel_path))
+
+
 # =========================================================
 # 2-1) Excel 파일에서 데이터 로드 (필수 - 하드코딩 데이터 없음)
 # =========================================================
@@ -212,7 +249,7 @@ def load_positions_from_excel(excel_path: str = None) -> pd.DataFrame:
                                 f"ALM_input_template.xlsx 파일이 필요합니다.")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         
         # POSITIONS 시트 로드 (첫 행이 컬럼명)
         positions_df = pd.read_excel(xl, sheet_name='POSITIONS')
@@ -284,33 +321,23 @@ def load_positions_from_excel(excel_path: str = None) -> pd.DataFrame:
         if 'asof' not in positions_df.columns:
             positions_df['asof'] = pd.Timestamp("2026-01-01")
         
-        # 마진 등급/점수 계산
-        def calc_margin_grade(spread_val):
-            try:
-                spread = float(spread_val)
-                if spread >= 0.015:
-                    return "HIGH"
-                elif spread >= 0.008:
-                    return "MEDIUM"
-                else:
-                    return "LOW"
-            except:
-                return "MEDIUM"
-        
-        def calc_margin_score(spread_val):
-            try:
-                spread = float(spread_val)
-                if spread >= 0.015:
-                    return min(0.8 + (spread - 0.015) * 10, 1.0)
-                elif spread >= 0.008:
-                    return 0.5 + (spread - 0.008) * 4.3
-                else:
-                    return spread * 62.5
-            except:
-                return 0.5
-        
-        positions_df['margin_grade'] = positions_df['spread'].apply(calc_margin_grade)
-        positions_df['margin_score'] = positions_df['spread'].apply(calc_margin_score)
+        # 마진 등급/점수 계산 — 행별 apply 대신 C 레벨 ufunc 패스
+        # (spread는 위에서 to_numeric + fillna를 거쳐 항상 숫자이므로 try/except 불필요)
+        spread_arr = positions_df['spread'].to_numpy(dtype=float)
+        positions_df['margin_grade'] = np.select(
+            [spread_arr >= 0.015, spread_arr >= 0.008],
+            ["HIGH", "MEDIUM"],
+            default="LOW",
+        )
+        positions_df['margin_score'] = np.where(
+            spread_arr >= 0.015,
+            np.minimum(0.8 + (spread_arr - 0.015) * 10, 1.0),
+            np.where(
+                spread_arr >= 0.008,
+                0.5 + (spread_arr - 0.008) * 4.3,
+                spread_arr * 62.5,
+            ),
+        )
         
         # HQLA 시트 로드
         hqla_df = pd.read_excel(xl, sheet_name='HQLA')
@@ -347,7 +374,20 @@ def load_positions_from_excel(excel_path: str = None) -> pd.DataFrame:
         
         # 두 DataFrame 결합
         combined_df = pd.concat([positions_df, hqla_df], ignore_index=True)
-        
+
+        # 반복 비교/그룹핑되는 문자열 컬럼은 카테고리로 캐스팅
+        # (정수 코드 비교 + 행당 1바이트 수준 메모리, == 필터는 그대로 동작)
+        combined_df['type'] = combined_df['type'].astype('category')
+        combined_df['product'] = combined_df['product'].astype('category')
+        if 'maturity_bucket' in combined_df.columns:
+            # BUCKET_ORDER 순서를 갖는 ordered 카테고리 — 표준 외 값(HQLA 공란 등)은
+            # NaN으로 바뀌지 않도록 카테고리 목록에 덧붙인다
+            seen = combined_df['maturity_bucket'].dropna().unique()
+            extra = sorted(str(v) for v in seen if v not in _BUCKET_RANK)
+            combined_df['maturity_bucket'] = combined_df['maturity_bucket'].astype(
+                pd.CategoricalDtype(list(BUCKET_ORDER) + extra, ordered=True)
+            )
+
         return combined_df
         
     except Exception as e:
@@ -377,7 +417,7 @@ def load_yield_curve_from_excel(excel_path: str = None, curve_name: str = "BASE"
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         yield_df = pd.read_excel(xl, sheet_name='YIELD_CURVE')
         
         # 컬럼명 정규화
@@ -439,7 +479,7 @@ def load_behavioral_params_from_excel(excel_path: str = None) -> Dict[str, float
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         behav_df = pd.read_excel(xl, sheet_name='BEHAVIORAL_PARAMS')
         
         # 컬럼명 정규화
@@ -506,7 +546,7 @@ def load_scenarios_from_excel(excel_path: str = None) -> Dict[str, Dict]:
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         
         if 'SCENARIOS' not in xl.sheet_names:
             raise ValueError("Excel 파일에 SCENARIOS 시트가 없습니다.")
@@ -584,7 +624,7 @@ def load_analysis_config_from_excel(excel_path: str = None) -> Dict[str, any]:
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         
         if 'ANALYSIS_CONFIG' not in xl.sheet_names:
             raise ValueError("Excel 파일에 ANALYSIS_CONFIG 시트가 없습니다.")
@@ -659,7 +699,7 @@ def load_lcr_forecast_from_excel(excel_path: str = None) -> pd.DataFrame:
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         
         # LCR_FORE 시트가 있는지 확인
         if 'LCR_FORE' not in xl.sheet_names:
@@ -711,14 +751,16 @@ def load_lcr_forecast_from_excel(excel_path: str = None) -> pd.DataFrame:
         outflow_values = lcr_df.iloc[outflow_row, 1:num_cols+1].tolist()
         inflow_values = lcr_df.iloc[inflow_row, 1:num_cols+1].tolist()
         
+        # 일자는 문자열로, 수치는 float32로 로드 시점에 한 번 정규화
+        # (rerun마다 str()/astype 변환을 반복하지 않도록)
         result_df = pd.DataFrame({
-            "일자": dates,
-            "LCR(%)": [float(v) if pd.notna(v) else 0.0 for v in lcr_values],
-            "고유동성자산(A)": [float(v) if pd.notna(v) else 0.0 for v in hqla_values],
-            "유출금액(B)": [float(v) if pd.notna(v) else 0.0 for v in outflow_values],
-            "유입금액(C)": [float(v) if pd.notna(v) else 0.0 for v in inflow_values],
+            "일자": pd.array([str(d) for d in dates], dtype="string"),
+            "LCR(%)": np.array([float(v) if pd.notna(v) else 0.0 for v in lcr_values], dtype=np.float32),
+            "고유동성자산(A)": np.array([float(v) if pd.notna(v) else 0.0 for v in hqla_values], dtype=np.float32),
+            "유출금액(B)": np.array([float(v) if pd.notna(v) else 0.0 for v in outflow_values], dtype=np.float32),
+            "유입금액(C)": np.array([float(v) if pd.notna(v) else 0.0 for v in inflow_values], dtype=np.float32),
         })
-        
+
         return result_df
         
     except Exception as e:
@@ -736,7 +778,7 @@ def get_available_excel_curves(excel_path: str = None) -> List[str]:
         raise FileNotFoundError(f"❌ Excel 파일을 찾을 수 없습니다: {excel_path}")
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         yield_df = pd.read_excel(xl, sheet_name='YIELD_CURVE')
         
         if 'curve_name' in yield_df.columns:
@@ -767,7 +809,7 @@ def validate_excel_file(excel_path: str = None) -> Tuple[bool, str]:
         return False, f"Excel 파일을 찾을 수 없습니다: {excel_path}"
     
     try:
-        xl = pd.ExcelFile(excel_path)
+        xl = _get_workbook(excel_path)
         
         required_sheets = ['POSITIONS', 'HQLA', 'YIELD_CURVE', 'BEHAVIORAL_PARAMS', 'SCENARIOS', 'ANALYSIS_CONFIG', 'LCR_FORE']
         missing_sheets = [s for s in required_sheets if s not in xl.sheet_names]
@@ -835,6 +877,30 @@ def curve_rate_for_years(t_years: np.ndarray, curve_x: List[float], curve_y: Lis
     return np.interp(t_years, curve_x, curve_y)
 
 
+@lru_cache(maxsize=64)
+def _discount_factors_cached(
+    t_days_i8: bytes,
+    curve_x_tup: Tuple[float, ...],
+    curve_y_tup: Tuple[float, ...],
+) -> np.ndarray:
+    """(일수 오프셋 바이트, 커브) 키로 할인계수 배열을 메모이즈합니다.
+
+    최적화/토네이도/시나리오 루프는 같은 날짜·커브로 수십 번 재평가하므로
+    보간+거듭제곱 계산이 커브당 한 번으로 줄어듭니다.
+    """
+    t_days = np.frombuffer(t_days_i8, dtype=np.int64).astype(float)
+    t_years = np.maximum(t_days / 365.0, 0.0)
+
+    # 커브 노트는 float64 배열로 한 번만 변환해 np.interp의
+    # 호출마다 list→ndarray 변환을 제거
+    r = curve_rate_for_years(
+        t_years,
+        np.asarray(curve_x_tup, dtype=np.float64),
+        np.asarray(curve_y_tup, dtype=np.float64),
+    )
+    return 1.0 / np.power(1.0 + r, t_years)
+
+
 def discount_factors_for_dates(
     dates: pd.DatetimeIndex,
     valuation_date: pd.Timestamp,
@@ -845,12 +911,16 @@ def discount_factors_for_dates(
     dates 각각에 대해 할인계수 DF(t)=1/(1+r(t))^(t)
     - r(t)는 커브 선형 보간
     - t는 year fraction
+    - 동일 (dates, 평가일, 커브) 조합은 lru_cache에서 재사용
     """
-    t_days = (dates - valuation_date).days.values.astype(float)
-    t_years = np.maximum(t_days / 365.0, 0.0)
-
-    r = curve_rate_for_years(t_years, curve_x, curve_y)
-    df = 1.0 / np.power(1.0 + r, t_years)
+    # 일수 오프셋은 캐시 밖에서 pandas 연산으로 계산 —
+    # 인덱스의 datetime64 해상도(ns/us)와 무관하게 동일한 키·결과를 보장
+    t_days = np.asarray((dates - valuation_date).days, dtype=np.int64)
+    df = _discount_factors_cached(
+        t_days.tobytes(),
+        tuple(curve_x),
+        tuple(curve_y),
+    )
     return pd.Series(df, index=dates)
 
 
@@ -1080,10 +1150,8 @@ def pv_from_cashflows_with_curve(
     if cashflows.empty:
         return 0.0
 
-    df = cashflows.copy()
-    df["date"] = pd.to_datetime(df["date"])
-
-    fut = df[df["date"] >= valuation_date]
+    # date는 생성 시점부터 datetime64[ns] — 재파싱/복사 없이 바로 필터
+    fut = cashflows[cashflows["date"] >= valuation_date]
     if fut.empty:
         return 0.0
 
@@ -1107,9 +1175,7 @@ def pv_breakdown_by_type_with_curve(
     if cashflows.empty:
         return {"asset": 0.0, "liability": 0.0, "net": 0.0}
 
-    df = cashflows.copy()
-    df["date"] = pd.to_datetime(df["date"])
-    fut = df[df["date"] >= valuation_date]
+    fut = cashflows[cashflows["date"] >= valuation_date]
     if fut.empty:
         return {"asset": 0.0, "liability": 0.0, "net": 0.0}
 
@@ -1166,8 +1232,7 @@ def compute_kpis_pro(
             "Stress_Survive": 1.0,
         }
 
-    df = cashflows.copy()
-    df["date"] = pd.to_datetime(df["date"])
+    df = cashflows
 
     # NII 누적
     nii = float(df.loc[df["date"] <= valuation_date, "interest"].sum())
@@ -1212,7 +1277,7 @@ def compute_kpis_pro(
     st_end = valuation_date + pd.Timedelta(days=int(stress_horizon_days))
     st_win = df[(df["date"] > valuation_date) & (df["date"] <= st_end)]
     daily_net = st_win.groupby("date")["cashflow"].sum().sort_index()
-    cum = daily_net.cumsum()
+    cum = np.cumsum(daily_net.to_numpy(dtype=float))
     min_buffer = float((hqla + cum).min()) if len(cum) else hqla
     survive = 1.0 if min_buffer >= 0 else 0.0
 
@@ -1458,24 +1523,43 @@ def run_nii_scenario_analysis(
 ) -> pd.DataFrame:
     """
     다양한 금리 시나리오에 대한 NII 영향 분석
+
+    금리갭 집계와 현재 NII는 한 번만 계산하고, 시나리오 축은
+    numpy 브로드캐스트로 한 번에 처리합니다 (시나리오별 루프 제거).
     """
-    results = []
-    
-    for bp_shock in rate_scenarios:
-        nii_result = simulate_nii_impact(positions, bp_shock, horizon_months)
-        
-        results.append({
-            "시나리오": f"{bp_shock:+d}bp" if bp_shock != 0 else "Base",
-            "금리충격(bp)": bp_shock,
-            "현재NII(조)": nii_result["current_nii"] / 1e12,
-            "NII변동(조)": nii_result["total_nii_impact"] / 1e12,
-            "예상NII(조)": nii_result["projected_nii"] / 1e12,
-            "NII변동률(%)": nii_result["nii_change_pct"],
-            "3M갭영향(조)": nii_result["nii_impact_3m"] / 1e12,
-            "6-12M갭영향(조)": nii_result["nii_impact_6m_12m"] / 1e12,
-        })
-    
-    return pd.DataFrame(results)
+    gap_info = calculate_aggregate_rate_gap(positions)
+
+    shocks_bp = np.asarray(rate_scenarios, dtype=float)
+    rate_change = shocks_bp / 10000
+    time_factor = horizon_months / 12
+
+    # simulate_nii_impact와 동일한 공식 (3M 갭: 전체 기간, 6-12M 갭: 절반 기간)
+    nii_impact_3m = gap_info["GAP_3M"] * rate_change * time_factor
+    gap_6m_to_12m = gap_info["GAP_12M"] - gap_info["GAP_3M"]
+    nii_impact_6m_12m = gap_6m_to_12m * rate_change * (time_factor * 0.5)
+    total_nii_impact = nii_impact_3m + nii_impact_6m_12m
+
+    assets = positions[positions["type"] == "asset"]
+    liabs = positions[positions["type"] == "liability"]
+    current_interest_income = (assets["balance"] * assets["rate"]).sum() * time_factor
+    current_interest_expense = (liabs["balance"] * liabs["rate"]).sum() * time_factor
+    current_nii = current_interest_income - current_interest_expense
+
+    if current_nii != 0:
+        nii_change_pct = total_nii_impact / current_nii * 100
+    else:
+        nii_change_pct = np.zeros_like(total_nii_impact)
+
+    return pd.DataFrame({
+        "시나리오": [f"{bp:+d}bp" if bp != 0 else "Base" for bp in rate_scenarios],
+        "금리충격(bp)": list(rate_scenarios),
+        "현재NII(조)": current_nii / 1e12,
+        "NII변동(조)": total_nii_impact / 1e12,
+        "예상NII(조)": (current_nii + total_nii_impact) / 1e12,
+        "NII변동률(%)": nii_change_pct,
+        "3M갭영향(조)": nii_impact_3m / 1e12,
+        "6-12M갭영향(조)": nii_impact_6m_12m / 1e12,
+    })
 
 
 def get_rate_gap_summary_table(
@@ -1536,34 +1620,38 @@ def run_behavioral_gap_analysis(
 ) -> pd.DataFrame:
     """
     특정 행동 파라미터를 변화시키며 자금 과부족(GAP) 분석
+
+    파라미터와 무관한 HQLA 합계는 루프 밖에서 한 번만 계산하고,
+    호라이즌별 GAP은 numpy 마스크 합으로 구합니다.
     """
     results = []
-    
+
+    # 루프 불변량: HQLA 잔액은 행동 파라미터의 영향을 받지 않음
+    hqla = float(positions[positions["type"] == "hqla"]["balance"].sum()) / 1e12
+    horizon_ends = {h: valuation_date + pd.Timedelta(days=h) for h in (30, 90, 180)}
+
     for param_value in param_range:
         behavioral = base_behavioral.copy()
         behavioral[param_name] = float(param_value)
-        
+
         cf = build_cashflow_schedule_fast(
             positions, start_date, end_date, behavioral,
             rate_shock_bp=0.0, scenario=f"{param_name}={param_value:.2%}"
         )
-        
+
         if cf.empty:
             continue
-        
-        # 30일 / 90일 / 180일 누적 GAP 계산
-        df = cf.copy()
-        df["date"] = pd.to_datetime(df["date"])
-        
+
+        # 30일 / 90일 / 180일 누적 GAP 계산 (날짜/CF 배열을 한 번만 꺼냄)
+        dates = cf["date"].to_numpy()
+        cf_values = cf["cashflow"].to_numpy(dtype=float)
+        after_valuation = dates > np.datetime64(valuation_date)
+
         gaps = {}
-        for horizon_days in [30, 90, 180]:
-            h_end = valuation_date + pd.Timedelta(days=horizon_days)
-            win = df[(df["date"] > valuation_date) & (df["date"] <= h_end)]
-            gap = float(win["cashflow"].sum())
-            gaps[f"GAP_{horizon_days}D"] = gap / 1e12
-        
-        hqla = float(positions[positions["type"] == "hqla"]["balance"].sum()) / 1e12
-        
+        for horizon_days, h_end in horizon_ends.items():
+            mask = after_valuation & (dates <= np.datetime64(h_end))
+            gaps[f"GAP_{horizon_days}D"] = float(cf_values[mask].sum()) / 1e12
+
         results.append({
             f"{param_name}": param_value,
             "HQLA(조)": hqla,
@@ -1574,7 +1662,7 @@ def run_behavioral_gap_analysis(
             "90일과부족": hqla + gaps["GAP_90D"],
             "180일과부족": hqla + gaps["GAP_180D"],
         })
-    
+
     return pd.DataFrame(results)
 
 
@@ -1696,52 +1784,42 @@ def optimize_behavioral_params(
             "message": f"초기 KPI 계산 실패: {str(e)}",
         }
     
-    def objective(params):
-        """NII를 최대화하기 위해 음수 반환"""
-        loan_prepay, deposit_rollover, runoff, early = params
-        
-        behavioral_temp = base_behavioral.copy()
-        behavioral_temp.update({
-            "loan_prepay_rate": float(loan_prepay),
-            "deposit_rollover_rate": float(deposit_rollover),
-            "runoff_rate": float(runoff),
-            "early_termination": float(early),
-        })
-        
-        try:
+    # 같은 파라미터 조합의 KPI 평가를 메모이즈 — objective와 constraint가
+    # 각 trial 지점에서 동일한 스케줄을 두 번 만들던 것을 한 번으로 줄이고,
+    # 재시도(trust-constr)나 라인서치의 중복 평가도 캐시에서 재사용
+    kpi_cache: Dict[Tuple[float, float, float, float], Dict[str, float]] = {}
+
+    def _eval_kpi(params) -> Dict[str, float]:
+        key = tuple(round(float(v), 12) for v in params)
+        kpi = kpi_cache.get(key)
+        if kpi is None:
+            behavioral_temp = base_behavioral.copy()
+            behavioral_temp.update({
+                "loan_prepay_rate": key[0],
+                "deposit_rollover_rate": key[1],
+                "runoff_rate": key[2],
+                "early_termination": key[3],
+            })
             cf = build_cashflow_schedule_fast(
                 positions, start_date, end_date, behavioral_temp,
                 rate_shock_bp=0.0, scenario="OPT"
             )
             kpi = compute_kpis_pro(positions, cf, valuation_date, curve_x, curve_y, 30, 90)
-            
-            # NII를 최대화 (음수로 반환)
-            return -kpi["NII_YTD"]
-        except Exception as e:
+            kpi_cache[key] = kpi
+        return kpi
+
+    def objective(params):
+        """NII를 최대화하기 위해 음수 반환"""
+        try:
+            return -_eval_kpi(params)["NII_YTD"]
+        except Exception:
             return 1e15
-    
+
     def constraint_lcr(params):
         """LCR >= target_lcr 제약 (soft)"""
-        loan_prepay, deposit_rollover, runoff, early = params
-        
-        behavioral_temp = base_behavioral.copy()
-        behavioral_temp.update({
-            "loan_prepay_rate": float(loan_prepay),
-            "deposit_rollover_rate": float(deposit_rollover),
-            "runoff_rate": float(runoff),
-            "early_termination": float(early),
-        })
-        
         try:
-            cf = build_cashflow_schedule_fast(
-                positions, start_date, end_date, behavioral_temp,
-                rate_shock_bp=0.0, scenario="OPT"
-            )
-            kpi = compute_kpis_pro(positions, cf, valuation_date, curve_x, curve_y, 30, 90)
-            
-            # LCR - target_lcr >= 0 이어야 함
-            return kpi["LCR"] - target_lcr
-        except Exception as e:
+            return _eval_kpi(params)["LCR"] - target_lcr
+        except Exception:
             return -1e15
     
     # 초기값 (더 보수적으로 설정)
@@ -2159,9 +2237,12 @@ def build_svg_animation(
     
     bar_w = (tl_x1 - tl_x0) / max(1, total_days + 1)
     tl_bars = []
+    # 루프 전에 배열로 꺼내 행당 .iloc 인덱서 디스패치를 제거
+    asset_cf_arr = cf_full["asset_cf"].to_numpy(dtype=float)
+    liab_cf_arr = cf_full["liability_cf"].to_numpy(dtype=float)
     for i in range(len(cf_full)):
-        a = float(cf_full.iloc[i]["asset_cf"])
-        l = float(cf_full.iloc[i]["liability_cf"])
+        a = asset_cf_arr[i]
+        l = liab_cf_arr[i]
         # 바 높이 (영역의 45%로 증가)
         ah = (abs(a) / vmax) * (tl_y1 - tl_y0) * 0.45
         lh = (abs(l) / vmax) * (tl_y1 - tl_y0) * 0.45
@@ -2543,8 +2624,10 @@ def plot_onepage_diagram_dynamic(
     ax_left.set_title("HQLA", fontsize=12, fontweight="bold", color="#073763")
     ax_left.axis("off")
 
-    hqla = positions[positions["type"] == "hqla"].copy()
-    total = float(hqla["balance"].sum())
+    hqla = positions[positions["type"] == "hqla"]
+    prods = hqla["product"].astype(str).to_numpy()
+    bals = hqla["balance"].to_numpy(dtype=float) / 1e9
+    total = float(bals.sum())
 
     ax_left.add_patch(
         Rectangle((0.05, 0.55), 0.9, 0.40, transform=ax_left.transAxes,
@@ -2552,12 +2635,11 @@ def plot_onepage_diagram_dynamic(
     )
     ax_left.text(0.08, 0.90, "고유동성자산(HQLA)", transform=ax_left.transAxes,
                  fontsize=11, fontweight="bold", color="#073763")
-    y = 0.82
-    for _, r in hqla.iterrows():
-        ax_left.text(0.10, y, f"- {r['product']}: {float(r['balance'])/1e9:,.0f} 조",
-                     transform=ax_left.transAxes, fontsize=9, color="#073763")
-        y -= 0.08
-    ax_left.text(0.10, 0.58, f"합계: {total/1e9:,.0f} 조", transform=ax_left.transAxes,
+    labels = [f"- {p}: {b:,.0f} 조" for p, b in zip(prods, bals)]
+    ys = 0.82 - 0.08 * np.arange(len(labels))
+    for lbl, yv in zip(labels, ys):
+        ax_left.text(0.10, yv, lbl, transform=ax_left.transAxes, fontsize=9, color="#073763")
+    ax_left.text(0.10, 0.58, f"합계: {total:,.0f} 조", transform=ax_left.transAxes,
                  fontsize=10, fontweight="bold", color="#073763")
 
     ms = BUCKET_X.get(margin_start, 1)
@@ -2596,45 +2678,32 @@ def plot_onepage_diagram_dynamic(
     ay = _y_coords(len(assets), y_top_a)
     ly = _y_coords(len(liabs), y_top_l)
 
-    # Assets draw
-    for i, r in assets.iterrows():
-        x = BUCKET_X.get(str(r["maturity_bucket"]), 2)
-        y = float(ay[i])
-
-        ax_mid.add_patch(
-            Ellipse((x, y), width=1.85, height=0.52,
-                    facecolor=ASSET_COLOR, edgecolor=ASSET_EDGE, alpha=0.55, linewidth=1.2)
-        )
-        ax_mid.text(x, y, f"{r['product']}\n{float(r['balance'])/1e9:,.0f}조",
-                    ha="center", va="center", fontsize=8, color="#073763")
-
-        dur = float(r["duration"])
-        dur_x = x + min(0.60, dur / 3.0)
-        ax_mid.add_patch(
-            FancyArrowPatch((x - 0.55, y), (dur_x, y),
-                            arrowstyle="->", mutation_scale=10, linewidth=1.4, color=DUR_COLOR)
-        )
-        ax_mid.text(x - 0.55, y + 0.30, f"Dur {dur:.2f}y", fontsize=7, color="black")
-
-    # Liabilities draw
-    for i, r in liabs.iterrows():
-        x = BUCKET_X.get(str(r["maturity_bucket"]), 2)
-        y = float(ly[i])
+    def _draw_items(ax, df, face, edge, alpha, text_color, y_arr):
+        """자산/부채 공용 드로잉 - 라벨/좌표를 한 번에 선계산 후 아티스트만 추가"""
+        if df.empty:
+            return
+        products = df["product"].astype(str).to_numpy()
+        balances = df["balance"].to_numpy(dtype=float)
+        durs = df["duration"].to_numpy(dtype=float)
+        xs = np.array([BUCKET_X.get(str(b), 2) for b in df["maturity_bucket"]], dtype=float)
+        labels = [f"{p}\n{b/1e9:,.0f}조" for p, b in zip(products, balances)]
+        dur_labels = [f"Dur {d:.2f}y" for d in durs]
+        dur_xs = xs + np.minimum(0.60, durs / 3.0)
+
+        for x, y, dur_x, label, dur_label in zip(xs, y_arr, dur_xs, labels, dur_labels):
+            ax.add_patch(
+                Ellipse((x, y), width=1.85, height=0.52,
+                        facecolor=face, edgecolor=edge, alpha=alpha, linewidth=1.2)
+            )
+            ax.text(x, y, label, ha="center", va="center", fontsize=8, color=text_color)
+            ax.add_patch(
+                FancyArrowPatch((x - 0.55, y), (dur_x, y),
+                                arrowstyle="->", mutation_scale=10, linewidth=1.4, color=DUR_COLOR)
+            )
+            ax.text(x - 0.55, y + 0.30, dur_label, fontsize=7, color="black")
 
-        ax_right.add_patch(
-            Ellipse((x, y), width=1.85, height=0.52,
-                    facecolor=LIAB_COLOR, edgecolor=LIAB_EDGE, alpha=0.75, linewidth=1.2)
-        )
-        ax_right.text(x, y, f"{r['product']}\n{float(r['balance'])/1e9:,.0f}조",
-                      ha="center", va="center", fontsize=8, color="#2b2f36")
-
-        dur = float(r["duration"])
-        dur_x = x + min(0.60, dur / 3.0)
-        ax_right.add_patch(
-            FancyArrowPatch((x - 0.55, y), (dur_x, y),
-                            arrowstyle="->", mutation_scale=10, linewidth=1.4, color=DUR_COLOR)
-        )
-        ax_right.text(x - 0.55, y + 0.30, f"Dur {dur:.2f}y", fontsize=7, color="black")
+    _draw_items(ax_mid, assets, ASSET_COLOR, ASSET_EDGE, 0.55, "#073763", ay)
+    _draw_items(ax_right, liabs, LIAB_COLOR, LIAB_EDGE, 0.75, "#2b2f36", ly)
 
     fig.suptitle("ALM One-Page — 구조/만기/듀레이션/마진 구간 (Dynamic Layout)", fontsize=14, fontweight="bold", color="#073763")
     return fig
@@ -2643,10 +2712,17 @@ def plot_onepage_diagram_dynamic(
 # =========================================================
 # 11) Sankey Diagram - FTP 기준 맵핑
 # =========================================================
+def _empty_sankey(title: str) -> go.Figure:
+    """데이터가 부족할 때 반환하는 빈 Sankey 플레이스홀더"""
+    fig = go.Figure()
+    fig.update_layout(height=360, margin=dict(l=20, r=20, t=30, b=20), title=title)
+    return fig
+
+
 def plot_sankey_funding(positions: pd.DataFrame) -> go.Figure:
     """
     FTP 기준 자금흐름 Sankey Diagram
-    
+
     맵핑 규칙:
     A. Core Banking: 대출·지준 ↔ (유동성예금 + 정기성예금)
     B. Treasury/ALM: (유가증권 + 자금부운용) ↔ (자본 + 자금부조달)
@@ -2658,9 +2734,7 @@ def plot_sankey_funding(positions: pd.DataFrame) -> go.Figure:
     hqla = positions[positions["type"] == "hqla"].copy()
 
     if assets.empty or liabs.empty:
-        fig = go.Figure()
-        fig.update_layout(height=360, margin=dict(l=20, r=20, t=30, b=20), title="Sankey (데이터 부족)")
-        return fig
+        return _empty_sankey("Sankey (데이터 부족)")
 
     # ========================================
     # 상품 분류 함수
@@ -2716,34 +2790,44 @@ def plot_sankey_funding(positions: pd.DataFrame) -> go.Figure:
     # Sankey 노드 및 링크 구성
     # ========================================
     # 노드 순서: 부채(좌측) → 중간블록 → 자산(우측)
-    
+    # 카테고리 접두사(A_/B_/C_)로 노드 색상을 구성 시점에 바로 결정 (Core/Treasury/기타)
+    category_colors = {
+        "A": "rgba(59, 130, 246, 0.8)",   # 파란색 - Core
+        "B": "rgba(16, 185, 129, 0.8)",   # 초록색 - Treasury
+        "C": "rgba(156, 163, 175, 0.8)",  # 회색 - 기타
+    }
+
     # 부채 노드 (Source)
     liab_nodes = []
     liab_values = []
+    liab_node_colors = []
     for cat in ["A_유동성예금", "A_정기성예금", "B_자본", "B_자금부조달", "C_기타부채"]:
         if cat in liab_by_cat and liab_by_cat[cat] > 0:
-            liab_nodes.append(cat.replace("A_", "").replace("B_", "").replace("C_", ""))
+            liab_nodes.append(cat[2:])
             liab_values.append(liab_by_cat[cat])
-    
+            liab_node_colors.append(category_colors[cat[0]])
+
     # 중간 블록 노드 (FTP Pool)
     block_nodes = ["Core Banking\n(대출-예수)", "Treasury/ALM\n(운용-조달)", "기타\n(Residual)"]
-    
+    block_node_colors = [category_colors["A"], category_colors["B"], category_colors["C"]]
+
     # 자산 노드 (Target)
     asset_nodes = []
     asset_values = []
+    asset_node_colors = []
     for cat in ["A_대출금", "A_지준예치금", "B_유가증권", "B_자금부운용", "C_기타자산"]:
         if cat in asset_by_cat and asset_by_cat[cat] > 0:
-            asset_nodes.append(cat.replace("A_", "").replace("B_", "").replace("C_", ""))
+            asset_nodes.append(cat[2:])
             asset_values.append(asset_by_cat[cat])
-    
-    # 정책FTP 노드
-    policy_node = ["정책FTP\n조정"]
-    
-    # 전체 노드 리스트
-    all_nodes = liab_nodes + block_nodes + asset_nodes + policy_node
-    
-    # 노드 인덱스 매핑
+            asset_node_colors.append(category_colors[cat[0]])
+
+    # 전체 노드 리스트 (정책FTP 노드는 데이터가 없어 구성 자체를 생략)
+    all_nodes = liab_nodes + block_nodes + asset_nodes
+    node_colors = liab_node_colors + block_node_colors + asset_node_colors
+
+    # 노드 인덱스 매핑 (멤버십 테스트는 frozenset으로 O(1))
     node_idx = {name: i for i, name in enumerate(all_nodes)}
+    all_nodes_set = frozenset(all_nodes)
     
     # ========================================
     # 링크 구성 (FTP 맵핑 규칙에 따라)
@@ -2752,138 +2836,130 @@ def plot_sankey_funding(positions: pd.DataFrame) -> go.Figure:
     targets = []
     values = []
     colors = []
-    
+
     # 색상 정의
     color_core = "rgba(59, 130, 246, 0.5)"      # 파란색 - Core Banking
     color_treasury = "rgba(16, 185, 129, 0.5)"  # 초록색 - Treasury
     color_other = "rgba(156, 163, 175, 0.5)"    # 회색 - 기타
     color_policy = "rgba(245, 158, 11, 0.5)"    # 노란색 - 정책FTP
-    
+
+    # 카테고리별 잔액을 로컬로 한 번만 언팩 (이후 dict 재조회 제거)
+    v_liq = liab_by_cat.get("A_유동성예금", 0.0)
+    v_td = liab_by_cat.get("A_정기성예금", 0.0)
+    v_eq = liab_by_cat.get("B_자본", 0.0)
+    v_fund = liab_by_cat.get("B_자금부조달", 0.0)
+    v_other_l = liab_by_cat.get("C_기타부채", 0.0)
+    v_loan = asset_by_cat.get("A_대출금", 0.0)
+    v_reserve = asset_by_cat.get("A_지준예치금", 0.0)
+    v_sec = asset_by_cat.get("B_유가증권", 0.0)
+    v_tsy = asset_by_cat.get("B_자금부운용", 0.0)
+    v_other_a = asset_by_cat.get("C_기타자산", 0.0)
+    inv_1e12 = 1e-12
+
+    # 전 블록 잔액이 1e9 미만이면 모든 링크가 0 근처로 렌더되므로 조기 종료
+    if max(v_liq + v_td, v_eq + v_fund, v_other_l) < 1e9:
+        return _empty_sankey("Sankey (링크 데이터 부족)")
+
     # A. Core Banking 블록: 유동성예금 + 정기성예금 → Core Banking → 대출금 + 지준예치금
-    core_liab_total = liab_by_cat.get("A_유동성예금", 0) + liab_by_cat.get("A_정기성예금", 0)
-    core_asset_total = asset_by_cat.get("A_대출금", 0) + asset_by_cat.get("A_지준예치금", 0)
-    
-    if core_liab_total > 0 and "Core Banking\n(대출-예수)" in all_nodes:
+    core_liab_total = v_liq + v_td
+    core_asset_total = v_loan + v_reserve
+
+    if core_liab_total > 0 and "Core Banking\n(대출-예수)" in all_nodes_set:
         core_block_idx = node_idx["Core Banking\n(대출-예수)"]
-        
+
         # 부채 → Core Banking
-        if "유동성예금" in all_nodes:
+        if "유동성예금" in all_nodes_set:
             sources.append(node_idx["유동성예금"])
             targets.append(core_block_idx)
-            values.append(liab_by_cat.get("A_유동성예금", 0) / 1e12)
+            values.append(v_liq * inv_1e12)
             colors.append(color_core)
-        
-        if "정기성예금" in all_nodes:
+
+        if "정기성예금" in all_nodes_set:
             sources.append(node_idx["정기성예금"])
             targets.append(core_block_idx)
-            values.append(liab_by_cat.get("A_정기성예금", 0) / 1e12)
+            values.append(v_td * inv_1e12)
             colors.append(color_core)
-        
+
         # Core Banking → 자산
         core_flow = min(core_liab_total, core_asset_total)
-        if "대출금" in all_nodes and asset_by_cat.get("A_대출금", 0) > 0:
-            ratio = asset_by_cat.get("A_대출금", 0) / core_asset_total if core_asset_total > 0 else 0
+        if "대출금" in all_nodes_set and v_loan > 0:
+            ratio = v_loan / core_asset_total if core_asset_total > 0 else 0
             sources.append(core_block_idx)
             targets.append(node_idx["대출금"])
-            values.append(core_flow * ratio / 1e12)
+            values.append(core_flow * ratio * inv_1e12)
             colors.append(color_core)
-        
-        if "지준예치금" in all_nodes and asset_by_cat.get("A_지준예치금", 0) > 0:
-            ratio = asset_by_cat.get("A_지준예치금", 0) / core_asset_total if core_asset_total > 0 else 0
+
+        if "지준예치금" in all_nodes_set and v_reserve > 0:
+            ratio = v_reserve / core_asset_total if core_asset_total > 0 else 0
             sources.append(core_block_idx)
             targets.append(node_idx["지준예치금"])
-            values.append(core_flow * ratio / 1e12)
+            values.append(core_flow * ratio * inv_1e12)
             colors.append(color_core)
-    
+
     # B. Treasury/ALM 블록: 자본 + 자금부조달 → Treasury → 유가증권 + 자금부운용
-    treasury_liab_total = liab_by_cat.get("B_자본", 0) + liab_by_cat.get("B_자금부조달", 0)
-    treasury_asset_total = asset_by_cat.get("B_유가증권", 0) + asset_by_cat.get("B_자금부운용", 0)
-    
-    if treasury_liab_total > 0 and "Treasury/ALM\n(운용-조달)" in all_nodes:
+    treasury_liab_total = v_eq + v_fund
+    treasury_asset_total = v_sec + v_tsy
+
+    if treasury_liab_total > 0 and "Treasury/ALM\n(운용-조달)" in all_nodes_set:
         treasury_block_idx = node_idx["Treasury/ALM\n(운용-조달)"]
-        
+
         # 부채 → Treasury
-        if "자본" in all_nodes:
+        if "자본" in all_nodes_set:
             sources.append(node_idx["자본"])
             targets.append(treasury_block_idx)
-            values.append(liab_by_cat.get("B_자본", 0) / 1e12)
+            values.append(v_eq * inv_1e12)
             colors.append(color_treasury)
-        
-        if "자금부조달" in all_nodes:
+
+        if "자금부조달" in all_nodes_set:
             sources.append(node_idx["자금부조달"])
             targets.append(treasury_block_idx)
-            values.append(liab_by_cat.get("B_자금부조달", 0) / 1e12)
+            values.append(v_fund * inv_1e12)
             colors.append(color_treasury)
-        
+
         # Treasury → 자산
         treasury_flow = min(treasury_liab_total, treasury_asset_total)
-        if "유가증권" in all_nodes and asset_by_cat.get("B_유가증권", 0) > 0:
-            ratio = asset_by_cat.get("B_유가증권", 0) / treasury_asset_total if treasury_asset_total > 0 else 0
+        if "유가증권" in all_nodes_set and v_sec > 0:
+            ratio = v_sec / treasury_asset_total if treasury_asset_total > 0 else 0
             sources.append(treasury_block_idx)
             targets.append(node_idx["유가증권"])
-            values.append(treasury_flow * ratio / 1e12)
+            values.append(treasury_flow * ratio * inv_1e12)
             colors.append(color_treasury)
-        
-        if "자금부운용" in all_nodes and asset_by_cat.get("B_자금부운용", 0) > 0:
-            ratio = asset_by_cat.get("B_자금부운용", 0) / treasury_asset_total if treasury_asset_total > 0 else 0
+
+        if "자금부운용" in all_nodes_set and v_tsy > 0:
+            ratio = v_tsy / treasury_asset_total if treasury_asset_total > 0 else 0
             sources.append(treasury_block_idx)
             targets.append(node_idx["자금부운용"])
-            values.append(treasury_flow * ratio / 1e12)
+            values.append(treasury_flow * ratio * inv_1e12)
             colors.append(color_treasury)
-    
+
     # C. 기타 블록: 기타부채 → 기타 → 기타자산
-    other_liab_total = liab_by_cat.get("C_기타부채", 0)
-    other_asset_total = asset_by_cat.get("C_기타자산", 0)
-    
-    if other_liab_total > 0 and "기타\n(Residual)" in all_nodes:
+    other_liab_total = v_other_l
+    other_asset_total = v_other_a
+
+    if other_liab_total > 0 and "기타\n(Residual)" in all_nodes_set:
         other_block_idx = node_idx["기타\n(Residual)"]
-        
-        if "기타부채" in all_nodes:
+
+        if "기타부채" in all_nodes_set:
             sources.append(node_idx["기타부채"])
             targets.append(other_block_idx)
-            values.append(other_liab_total / 1e12)
+            values.append(other_liab_total * inv_1e12)
             colors.append(color_other)
-        
-        if "기타자산" in all_nodes and other_asset_total > 0:
+
+        if "기타자산" in all_nodes_set and other_asset_total > 0:
             sources.append(other_block_idx)
             targets.append(node_idx["기타자산"])
-            values.append(min(other_liab_total, other_asset_total) / 1e12)
+            values.append(min(other_liab_total, other_asset_total) * inv_1e12)
             colors.append(color_other)
     
     # D. 정책FTP 조정 - 현재 엑셀에 정책FTP 데이터가 없으므로 비활성화
     # 향후 엑셀에 정책FTP 시트가 추가되면 해당 데이터를 읽어서 처리
     # policy_ftp_data = load_policy_ftp_from_excel() 형태로 구현 가능
     
-    # ========================================
-    # 노드 색상 정의
-    # ========================================
-    # 정책FTP 노드 제거 (데이터 없음)
-    if "정책FTP\n조정" in all_nodes:
-        all_nodes.remove("정책FTP\n조정")
-        node_idx = {name: i for i, name in enumerate(all_nodes)}  # 인덱스 재계산
-    
-    node_colors = []
-    for node in all_nodes:
-        if "유동성" in node or "정기성" in node or "대출" in node or "지준" in node:
-            node_colors.append("rgba(59, 130, 246, 0.8)")  # 파란색 - Core
-        elif "자본" in node or "자금부" in node or "유가증권" in node or "Treasury" in node:
-            node_colors.append("rgba(16, 185, 129, 0.8)")  # 초록색 - Treasury
-        elif "기타" in node or "Residual" in node:
-            node_colors.append("rgba(156, 163, 175, 0.8)")  # 회색 - 기타
-        elif "정책" in node or "FTP" in node:
-            node_colors.append("rgba(245, 158, 11, 0.8)")  # 노란색 - 정책FTP
-        elif "Core" in node:
-            node_colors.append("rgba(59, 130, 246, 0.8)")
-        else:
-            node_colors.append("rgba(107, 114, 128, 0.8)")
-    
     # ========================================
     # Sankey 다이어그램 생성
     # ========================================
     if len(sources) == 0:
-        fig = go.Figure()
-        fig.update_layout(height=360, margin=dict(l=20, r=20, t=30, b=20), title="Sankey (링크 데이터 부족)")
-        return fig
+        return _empty_sankey("Sankey (링크 데이터 부족)")
     
     fig = go.Figure(
         data=[
@@ -2931,26 +3007,29 @@ def plot_cashflow_timeline(cashflows: pd.DataFrame, valuation_date: pd.Timestamp
         fig.update_layout(height=320, margin=dict(l=20, r=20, t=30, b=20), title="현금흐름(데이터 없음)")
         return fig
 
-    df["date"] = pd.to_datetime(df["date"])
-
     start = valuation_date - pd.Timedelta(days=window_days)
     end = valuation_date + pd.Timedelta(days=window_days)
-    win = df[(df["date"] >= start) & (df["date"] <= end)].copy()
+    win = df[(df["date"] >= start) & (df["date"] <= end)]
 
-    a = win[win["type"] == "asset"].groupby("date")["cashflow"].sum()
-    l = win[win["type"] == "liability"].groupby("date")["cashflow"].sum()
+    # 일자 오프셋 기반 단일 집계 패스 (groupby ×2 + reindex ×2 대체)
     idx = pd.date_range(start, end, freq="D")
-    a = a.reindex(idx).fillna(0.0)
-    l = l.reindex(idx).fillna(0.0)
+    n = len(idx)
+    offsets = (win["date"] - start).dt.days.to_numpy()
+    cf = win["cashflow"].to_numpy(dtype=float)
+    types = win["type"].to_numpy()
+    is_asset = types == "asset"
+    is_liab = types == "liability"
+    a = np.bincount(offsets[is_asset], weights=cf[is_asset], minlength=n)
+    l = np.bincount(offsets[is_liab], weights=cf[is_liab], minlength=n)
 
     net = a + l
     cum = net.cumsum()
 
     fig = go.Figure()
-    fig.add_trace(go.Bar(x=idx, y=a.values, name="Asset CF", marker_color=ASSET_CF_COLOR, opacity=0.55))
-    fig.add_trace(go.Bar(x=idx, y=l.values, name="Liability CF", marker_color=LIAB_CF_COLOR, opacity=0.55))
-    fig.add_trace(go.Scatter(x=idx, y=net.values, name="Net CF(GAP)", mode="lines", line=dict(width=2)))
-    fig.add_trace(go.Scatter(x=idx, y=cum.values, name="Cumulative Net", mode="lines", line=dict(width=2, dash="dot")))
+    fig.add_trace(go.Bar(x=idx, y=a, name="Asset CF", marker_color=ASSET_CF_COLOR, opacity=0.55))
+    fig.add_trace(go.Bar(x=idx, y=l, name="Liability CF", marker_color=LIAB_CF_COLOR, opacity=0.55))
+    fig.add_trace(go.Scatter(x=idx, y=net, name="Net CF(GAP)", mode="lines", line=dict(width=2)))
+    fig.add_trace(go.Scatter(x=idx, y=cum, name="Cumulative Net", mode="lines", line=dict(width=2, dash="dot")))
     fig.add_vline(x=valuation_date, line_width=2, line_dash="dash", line_color="rgba(7,55,99,0.55)")
 
     fig.update_layout(
@@ -2977,6 +3056,14 @@ def fmt_조(x: float) -> str:
         return "INF"
     return f"{x/1e12:,.2f}조"
 
+def _fmt_trillion(arr) -> list:
+    """잔액 배열을 '조' 단위 표시 문자열 리스트로 변환 (Series.apply 대체)."""
+    return [f"{x/1e9:,.2f} 조" for x in arr]
+
+def _fmt_pct(arr, scale: float = 100.0, digits: int = 2) -> list:
+    """비율 배열을 % 표시 문자열 리스트로 변환 (Series.apply 대체)."""
+    return [f"{x*scale:.{digits}f}%" for x in arr]
+
 def fmt_num(x: float) -> str:
     if math.isinf(x):
         return "INF"
@@ -2995,74 +3082,844 @@ def delta_class(x: float) -> str:
 # 🆕 generate_sample_positions 제거됨 - Excel 데이터만 사용
 
 @st.cache_data(show_spinner=False)
-def cached_excel_positions(excel_path: str = None) -> pd.DataFrame:
-    """Excel 파일에서 포지션 데이터를 캐시하여 로드"""
+def cached_excel_positions(excel_path: str, mtime: float) -> pd.DataFrame:
+    """Excel 파일에서 포지션 데이터를 캐시하여 로드 (mtime으로 무효화)"""
     return load_positions_from_excel(excel_path)
 
 
 @st.cache_data(show_spinner=False)
-def cached_excel_yield_curve(excel_path: str = None, curve_name: str = "BASE") -> Tuple[List[float], List[float]]:
-    """Excel 파일에서 Yield Curve를 캐시하여 로드"""
+def cached_excel_yield_curve(excel_path: str, mtime: float, curve_name: str = "BASE") -> Tuple[List[float], List[float]]:
+    """Excel 파일에서 Yield Curve를 캐시하여 로드 (mtime으로 무효화)"""
     return load_yield_curve_from_excel(excel_path, curve_name)
 
 
 @st.cache_data(show_spinner=False)
-def cached_excel_behavioral_params(excel_path: str = None) -> Dict[str, float]:
-    """Excel 파일에서 행동 파라미터를 캐시하여 로드"""
+def cached_excel_behavioral_params(excel_path: str, mtime: float) -> Dict[str, float]:
+    """Excel 파일에서 행동 파라미터를 캐시하여 로드 (mtime으로 무효화)"""
     return load_behavioral_params_from_excel(excel_path)
 
 
+@st.cache_data(show_spinner=False)
+def cached_excel_scenarios(excel_path: str, mtime: float) -> Dict[str, Dict]:
+    """Excel 파일에서 시나리오 설정을 캐시하여 로드 (mtime으로 무효화)"""
+    return load_scenarios_from_excel(excel_path)
+
 
+@st.cache_data(show_spinner=False)
+def cached_excel_analysis_config(excel_path: str, mtime: float) -> Dict[str, any]:
+    """Excel 파일에서 분석 설정을 캐시하여 로드 (mtime으로 무효화)"""
+    return load_analysis_config_from_excel(excel_path)
 
-def main():
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.markdown('<div class="h1">🚀 ALM Visualizer PRO — Advanced Simulation Suite</div>', unsafe_allow_html=True)
-    st.markdown(
-        '<div class="sub">금리 시나리오 분석 | 행동비율 과부족 분석 | 민감도 분석 | 최적화 시뮬레이션 | DV01 | Yield Curve</div>',
-        unsafe_allow_html=True
+
+@st.cache_data(show_spinner=False)
+def cached_excel_validation(excel_path: str, mtime: float) -> Tuple[bool, str]:
+    """Excel 파일 유효성 검사 결과를 파일 수정 시각 기준으로 캐시"""
+    return validate_excel_file(excel_path)
+
+
+def _save_uploaded(uploaded_file) -> None:
+    """업로드된 xlsx를 전체 버퍼 복사 없이 스트리밍으로 저장"""
+    with open(DEFAULT_EXCEL_PATH, "wb") as f:
+        shutil.copyfileobj(uploaded_file, f, length=1 << 20)
+    st.success("✅ 파일이 업로드되었습니다. 페이지를 새로고침하세요.")
+    st.rerun()
+
+
+# KPI 테이블 정적 CSS (동적 값이 없으므로 모듈 상수로 1회 생성)
+_KPI_TABLE_CSS = """
+<style>
+.kpi-table {
+    width: 100%;
+    border-collapse: separate;
+    border-spacing: 0;
+    font-size: 13px;
+}
+.kpi-table th {
+    background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%);
+    padding: 10px 12px;
+    text-align: center;
+    font-weight: 700;
+    color: #475569;
+    border-bottom: 2px solid #e2e8f0;
+}
+.kpi-table th:first-child {
+    text-align: left;
+    border-radius: 8px 0 0 0;
+}
+.kpi-table th:last-child {
+    border-radius: 0 8px 0 0;
+}
+.kpi-table td {
+    padding: 12px;
+    text-align: center;
+    border-bottom: 1px solid #f1f5f9;
+}
+.kpi-table td:first-child {
+    text-align: left;
+    font-weight: 600;
+    color: #334155;
+    background: #fafbfc;
+}
+.kpi-table tr:last-child td {
+    border-bottom: none;
+}
+.kpi-table tr:last-child td:first-child {
+    border-radius: 0 0 0 8px;
+}
+.kpi-table .val-base {
+    font-weight: 700;
+    color: #1e40af;
+    font-size: 14px;
+}
+.kpi-table .val-stress {
+    font-weight: 700;
+    color: #9333ea;
+    font-size: 14px;
+}
+</style>
+"""
+
+
+# KPI 테이블 행 템플릿 (셀 값만 채우는 모듈 상수)
+_KPI_ROWS_TEMPLATE = (
+    '<tr><td>💰 HQLA</td>'
+    '<td class="val-base">{b_HQLA}</td><td class="val-stress">{s_HQLA}</td>'
+    '<td>{d_HQLA}</td><td>{st_HQLA}</td></tr>'
+    '<tr><td>📈 NII (순이자수익)</td>'
+    '<td class="val-base">{b_NII_YTD}</td><td class="val-stress">{s_NII_YTD}</td>'
+    '<td>{d_NII_YTD}</td><td>{st_NII}</td></tr>'
+    '<tr><td>💎 NPV (순현재가치)</td>'
+    '<td class="val-base">{b_NPV}</td><td class="val-stress">{s_NPV}</td>'
+    '<td>{d_NPV}</td><td>{st_NPV}</td></tr>'
+    '<tr><td>📊 DV01 (Net)</td>'
+    '<td class="val-base">{b_DV01}</td><td class="val-stress">{s_DV01}</td>'
+    '<td><span style="color:#64748b;font-size:11px;">자산 {dv01_asset} / 부채 {dv01_liab}</span></td>'
+    '<td>{st_DV01}</td></tr>'
+    '<tr><td>🏦 LCR</td>'
+    '<td class="val-base">{b_LCR}</td><td class="val-stress">{s_LCR}</td>'
+    '<td><span style="color:#64748b;font-size:11px;">30일유출 {outflow_30d}</span></td>'
+    '<td>{st_LCR}</td></tr>'
+    '<tr><td>🛡️ Stress 생존</td>'
+    '<td class="val-base">{b_SURV}</td><td class="val-stress">{s_SURV}</td>'
+    '<td colspan="2" style="text-align:center;">'
+    '<span style="font-size:11px;color:#64748b;">{stress_h}일 스트레스 테스트 기준</span></td></tr>'
+)
+
+
+# 도넛차트 색상/레이아웃 (정적 설정 - rerun마다 dict를 다시 만들 필요 없음)
+_ASSET_COLORS = {
+    "Gov Bond": "#00bcd4",      # 청록색
+    "Credit Card": "#4fc3f7",   # 밝은 파랑
+    "Household Loan": "#2196f3", # 파랑
+    "Mortgage": "#1565c0",      # 진한 파랑
+    "Corporate Loan": "#0d47a1", # 아주 진한 파랑
+    "Corporate Bond": "#64b5f6", # 연한 파랑
+    "Other": "#90caf9"          # 매우 연한 파랑
+}
+_LIAB_COLORS = {
+    "Corporate Bond": "#ff9800",   # 주황색
+    "Borrowing": "#e65100",        # 진한 주황
+    "Savings": "#8d6e63",          # 갈색
+    "Demand Deposit": "#a1887f",   # 연한 갈색
+    "Time Deposit": "#4e342e",     # 진한 갈색
+    "Other": "#bcaaa4"             # 매우 연한 갈색
+}
+_PIE_LAYOUT = dict(
+    showlegend=True,
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=-0.2,
+        xanchor="center",
+        x=0.5,
+        font=dict(size=10)
+    ),
+    margin=dict(t=40, b=80, l=20, r=20),
+    height=320,
+    paper_bgcolor="rgba(0,0,0,0)",
+    plot_bgcolor="rgba(0,0,0,0)"
+)
+_YC_LAYOUT = dict(
+    xaxis_title="만기(년)",
+    yaxis_title="금리(%)",
+    height=200,
+    margin=dict(t=10, b=30, l=40, r=10)
+)
+
+
+# 도넛차트 상품 분류 규칙 (위에서부터 먼저 매칭, 대소문자 무시 선컴파일 정규식)
+_ASSET_RULES = tuple(
+    (name, re.compile(pat, re.IGNORECASE))
+    for name, pat in (
+        ("Gov Bond", r"국채|gov"),
+        ("Credit Card", r"카드|credit|리볼빙"),
+        ("Household Loan", r"가계|household"),
+        ("Mortgage", r"mortgage|주택"),
+        ("Corporate Loan", r"기업|corporate"),
+        ("Corporate Bond", r"채권|bond"),
     )
-    st.markdown("</div>", unsafe_allow_html=True)
+)
+_LIAB_RULES = tuple(
+    (name, re.compile(pat, re.IGNORECASE))
+    for name, pat in (
+        ("Corporate Bond", r"회사채|corporate bond"),
+        ("Borrowing", r"차입|borrow"),
+        ("Savings", r"저축|saving"),
+        ("Demand Deposit", r"요구불|demand|mmda"),
+        ("Time Deposit", r"정기|time|예금"),
+    )
+)
 
-    # =====================================================
-    # 🆕 Excel 파일 필수 검증 (하드코딩 데이터 사용 안함)
-    # =====================================================
-    excel_exists = os.path.exists(DEFAULT_EXCEL_PATH)
-    
-    if not excel_exists:
-        st.error(f"""
-        ## ❌ Excel 파일이 필요합니다
-        
-        **ALM_input_template.xlsx** 파일을 찾을 수 없습니다.
-        
-        ### 필요한 파일 위치:
-        - `{DEFAULT_EXCEL_PATH}`
-        
-        ### 필수 시트 목록:
-        1. **POSITIONS** - 자산/부채 포지션 데이터
-        2. **HQLA** - 고유동성자산 데이터
-        3. **YIELD_CURVE** - 금리 커브 (BASE, STRESS)
-        4. **BEHAVIORAL_PARAMS** - 행동 파라미터 (조기상환율, 재예치율 등)
-        5. **SCENARIOS** - 시나리오별 파라미터 설정
-        6. **ANALYSIS_CONFIG** - 분석 기간, Horizon 설정
-        7. **LCR_FORE** - LCR 예측 기초자료
-        
-        ### 해결 방법:
-        1. Excel 템플릿 파일을 현재 디렉토리에 위치시키세요.
-        2. 또는 아래에서 파일을 업로드하세요.
-        """)
-        
+
+def _categorize_products(products: pd.Series, rules) -> np.ndarray:
+    """상품명 Series를 규칙 테이블로 일괄 분류 (행별 apply 대신 단일 벡터 패스)"""
+    prods = products.astype(str)
+    conds = [prods.str.contains(pat, regex=True, na=False) for _, pat in rules]
+    return np.select(conds, [name for name, _ in rules], default="Other")
+
+
+@st.cache_data(show_spinner=False)
+def _csv_bytes(cache_key, _df) -> bytes:
+    """다운로드 버튼용 CSV 직렬화 결과를 캐시합니다 (클릭 여부와 무관하게
+    rerun마다 수백 MB를 다시 인코딩하지 않도록).
+
+    pyarrow가 있으면 C++ 스트리밍 writer로 직렬화하고(대형 CF에서 수 배
+    빠르고 피크 메모리 절반), 없으면 pandas to_csv로 동작합니다.
+    BOM은 Excel 호환용(utf-8-sig와 동일)입니다.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        return _df.to_csv(index=False).encode('utf-8-sig')
+    table = pa.Table.from_pandas(_df, preserve_index=False)
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(table, buf, pacsv.WriteOptions(include_header=True))
+    return b'\xef\xbb\xbf' + buf.getvalue().to_pybytes()
+
+
+@st.cache_data(show_spinner=False)
+def _xlsx_bytes(cache_key, _detail, _agg, _prod) -> bytes:
+    """상세/집계/상품별 CF를 묶은 Excel 직렬화 결과를 캐시합니다."""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        _detail.to_excel(writer, sheet_name='상세CF', index=False)
+        _agg.to_excel(writer, sheet_name='집계CF', index=False)
+        if not _prod.empty:
+            _prod.to_excel(writer, sheet_name='상품별CF', index=False)
+    return output.getvalue()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cached_cf(pos_key, _positions, start_str, end_str, behavioral_items,
+               scenario="ANIMATION") -> pd.DataFrame:
+    """애니메이션용 CF 스케줄을 캐시합니다.
+
+    스케줄은 (positions, 기간, 행동 파라미터)에만 의존하므로 초당 수회
+    반복되는 애니메이션 틱 rerun에서 재계산할 이유가 없습니다.
+    """
+    return build_cashflow_schedule_fast(
+        _positions, start_str, end_str, dict(behavioral_items),
+        rate_shock_bp=0.0, scenario=scenario
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _svg_frame(pos_key, cf_key, _positions, _daily_cf, day_index, total_days,
+               base_seconds_per_cycle, _product_cf) -> str:
+    """애니메이션 프레임(SVG 문자열)을 일자 단위로 메모이즈합니다.
+
+    같은 day_index를 다시 그리는 rerun(일시정지, 슬라이더 조작, 반복 재생)
+    에서는 전체 SVG를 재생성하지 않고 캐시된 문자열을 그대로 반환합니다.
+    """
+    return build_svg_animation(
+        _positions, _daily_cf, day_index, total_days,
+        base_seconds_per_cycle, _product_cf
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _lcr_fore_lookup(excel_path, excel_mtime) -> Dict[str, Dict[str, float]]:
+    """LCR_FORE 시트를 일자→기초자료 딕셔너리로 변환해 캐시합니다.
+
+    애니메이션 틱마다 시트 파싱과 iterrows 순회를 반복하지 않도록
+    (경로, mtime)이 바뀔 때만 다시 만듭니다.
+    """
+    lcr_fore_df = load_lcr_forecast_from_excel(excel_path)
+    if lcr_fore_df.empty:
+        return {}
+
+    def _col(names, default):
+        for name in names:
+            if name in lcr_fore_df.columns:
+                return lcr_fore_df[name].to_numpy()
+        return np.full(len(lcr_fore_df), default)
+
+    days = lcr_fore_df["일자"].astype(str).to_numpy()
+    lcr_arr = _col(["LCR(%)"], 100.0)
+    hqla_arr = _col(["고유동성자산(A)"], 20.0)
+    outflow_arr = _col(["유출금액(B)", "현금유출(B)"], 120.0)
+    inflow_arr = _col(["유입금액(C)", "현금유입(C)"], 100.0)
+    return {
+        d: {"lcr": l, "hqla": h, "outflow": o, "inflow": i}
+        for d, l, h, o, i in zip(days, lcr_arr, hqla_arr, outflow_arr, inflow_arr)
+    }
+
+
+@st.cache_data(show_spinner=False)
+def _anim_kpi_html(nii, lcr, original, delta, adj_hqla, base_hqla, gap, net_out, out, inflow) -> str:
+    """애니메이션 상단 KPI 카드 HTML을 반올림된 값 기준으로 메모이즈합니다.
+
+    일시정지나 값이 표시 정밀도 이하로만 움직이는 틱에서는 문자열을
+    다시 만들지 않습니다.
+    """
+    lcr_color = "#10b981" if lcr >= 100 else "#ef4444"  # 100% 이상: 녹색, 미만: 빨강
+    delta_color = "#10b981" if delta >= 0 else "#ef4444"  # 증가: 녹색, 감소: 빨강
+    delta_sign = "+" if delta >= 0 else ""
+    return f"""
+    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                padding: 20px; border-radius: 16px; margin-bottom: 20px; color: white;">
+        <div style="display: grid; grid-template-columns: repeat(5, 1fr); gap: 15px;">
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
+                <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">📊 NII (누적)</div>
+                <div style="font-size: 24px; font-weight: 800;">{nii:.2f}조</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
+                <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">💧 LCR (조정)</div>
+                <div style="font-size: 24px; font-weight: 800; color: {lcr_color};">{lcr:.1f}%</div>
+                <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">원본: {original:.1f}% | <span style="color:{delta_color}">{delta_sign}{delta:.1f}%p</span></div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
+                <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">🏦 HQLA (조정)</div>
+                <div style="font-size: 24px; font-weight: 800;">{adj_hqla:.2f}조</div>
+                <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">기준: {base_hqla:.2f}조</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
+                <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">💰 CF 누적 GAP</div>
+                <div style="font-size: 24px; font-weight: 800;">{gap:.2f}조</div>
+            </div>
+            <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
+                <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">📈 순유출</div>
+                <div style="font-size: 24px; font-weight: 800;">{net_out:.2f}조</div>
+                <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">유출:{out:.1f} - 유입:{inflow:.1f}</div>
+            </div>
+        </div>
+    </div>
+    """
+
+
+@st.cache_data(show_spinner=False)
+def _hqla_cash_split(pos_key, _positions) -> Tuple[float, float]:
+    """HQLA를 현금/기타로 한 번만 분해해 (cash0, hqla_other) 합계를 반환합니다.
+
+    str.contains(정규식) 필터를 애니메이션 틱마다 돌리지 않도록 포지션
+    해시 기준으로 캐시합니다.
+    """
+    is_hqla = _positions["type"].to_numpy() == "hqla"
+    prod = _positions["product"]
+    if isinstance(prod.dtype, pd.CategoricalDtype):
+        # 카테고리 사전에만 부분일치 검사(O(상품종류)) 후 코드 조회로 확장
+        # Index.str.contains는 ndarray를 반환하므로 np.asarray로 감싼다
+        per_cat = np.append(
+            np.asarray(prod.cat.categories.astype(str).str.contains("현금", na=False)),
+            False,  # 코드 -1(NaN)용
+        )
+        is_cash = per_cat[prod.cat.codes.to_numpy()]
+    else:
+        is_cash = prod.astype(str).str.contains("현금", na=False).to_numpy()
+    bal = _positions["balance"].to_numpy(dtype=float)
+    cash0 = float(bal[is_hqla & is_cash].sum())
+    hqla_other = float(bal[is_hqla & ~is_cash].sum())
+    return cash0, hqla_other
+
+
+@st.cache_data(show_spinner=False)
+def _bucket_sums(pos_key, _df, col, bmap_items) -> Tuple[pd.Series, pd.Series]:
+    """버킷 매핑 후 자산/부채별 잔액 합계를 포지션 해시 기준으로 캐시합니다.
+
+    만기 갭과 금리 재조정 갭이 (col, 매핑)만 달리해 같은 집계를 쓰므로
+    rerun/애니메이션 틱마다 groupby를 반복하지 않습니다.
+    """
+    labels = _df[col].map(dict(bmap_items))
+    # 버킷 코드를 한 번만 만들고 자산/부채를 bincount 단일 패스로 동시 집계
+    codes, uniq = pd.factorize(labels)
+    nb = len(uniq)
+    types_arr = _df["type"].astype(str).to_numpy()
+    bal = _df["balance"].to_numpy(dtype=float)
+    valid = codes >= 0  # 매핑되지 않은 버킷(NaN)은 groupby와 동일하게 제외
+    sel_a = valid & (types_arr == "asset")
+    sel_l = valid & (types_arr == "liability")
+    asset_sum = pd.Series(
+        np.bincount(codes[sel_a], weights=bal[sel_a], minlength=nb), index=uniq
+    )
+    liab_sum = pd.Series(
+        np.bincount(codes[sel_l], weights=bal[sel_l], minlength=nb), index=uniq
+    )
+    return asset_sum, liab_sum
+
+
+@st.cache_data(show_spinner=False)
+def _composition_figs(pos_key, _positions) -> Tuple[go.Figure, go.Figure]:
+    """자산/부채 구성 도넛 Figure를 포지션 해시 기준으로 캐시합니다.
+
+    구성은 positions에만 의존하므로 슬라이더 등 시나리오 위젯이
+    바뀌어도 Figure를 다시 만들지 않습니다.
+    """
+    assets_for_pie = _positions[_positions["type"] == "asset"]
+    asset_cats = _categorize_products(assets_for_pie["product"], _ASSET_RULES)
+    asset_comp = (
+        assets_for_pie.groupby(asset_cats)["balance"].sum()
+        .rename_axis("category").reset_index()
+    )
+
+    fig_asset = go.Figure(data=[go.Pie(
+        labels=asset_comp["category"],
+        values=asset_comp["balance"],
+        hole=0.6,
+        marker=dict(colors=[_ASSET_COLORS.get(cat, "#7fb6ff") for cat in asset_comp["category"]]),
+        textinfo="none",
+        hovertemplate="<b>%{label}</b><br>%{value:,.0f}<br>%{percent}<extra></extra>"
+    )])
+
+    fig_asset.update_layout(
+        title=dict(text="ASSET COMPOSITION", font=dict(size=14, color="#073763", family="Arial Black")),
+        **_PIE_LAYOUT
+    )
+
+    liabs_for_pie = _positions[_positions["type"] == "liability"]
+    liab_cats = _categorize_products(liabs_for_pie["product"], _LIAB_RULES)
+    liab_comp = (
+        liabs_for_pie.groupby(liab_cats)["balance"].sum()
+        .rename_axis("category").reset_index()
+    )
+
+    fig_liab = go.Figure(data=[go.Pie(
+        labels=liab_comp["category"],
+        values=liab_comp["balance"],
+        hole=0.6,
+        marker=dict(colors=[_LIAB_COLORS.get(cat, "#ff9f1a") for cat in liab_comp["category"]]),
+        textinfo="none",
+        hovertemplate="<b>%{label}</b><br>%{value:,.0f}<br>%{percent}<extra></extra>"
+    )])
+
+    fig_liab.update_layout(
+        title=dict(text="LIABILITY COMPOSITION", font=dict(size=14, color="#073763", family="Arial Black")),
+        **_PIE_LAYOUT
+    )
+
+    return fig_asset, fig_liab
+
+
+def _positions_key(df):
+    """포지션 해시를 세션에 캐시해 rerun마다 전체 해시 계산을 피합니다.
+
+    (객체 id, 행 수, balance 합) 지문이 직전 rerun과 같으면 저장된 해시를
+    재사용하고, 다르면 한 번만 hash_pandas_object를 다시 계산합니다.
+    """
+    fp = (id(df), len(df), float(df["balance"].sum()))
+    cached = st.session_state.get("_pos_key_cache")
+    if cached is not None and cached[0] == fp:
+        return cached[1]
+    key = int(pd.util.hash_pandas_object(df, index=False).sum())
+    st.session_state["_pos_key_cache"] = (fp, key)
+    return key
+
+
+@st.cache_data(show_spinner=False)
+def _type_detail_figs(pos_key, _df, bar_color, label) -> go.Figure:
+    """데이터 분석 탭의 만기 분포 바 + 상품 비중 파이를 포지션 해시로 캐시합니다.
+
+    레이아웃을 공유하는 1×2 서브플롯 하나로 만들어 Figure JSON을 절반으로
+    줄입니다.
+    """
+    fig = make_subplots(
+        rows=1, cols=2,
+        specs=[[{"type": "bar"}, {"type": "domain"}]],
+        subplot_titles=(f"{label} 만기별 잔액 분포", f"{label} 상품별 비중"),
+    )
+
+    bucket_summary = _df.groupby('maturity_bucket', observed=True)['balance'].sum().reset_index()
+    fig.add_trace(
+        go.Bar(x=bucket_summary['maturity_bucket'],
+               y=bucket_summary['balance']/1e9,
+               marker_color=bar_color,
+               showlegend=False),
+        row=1, col=1,
+    )
+
+    product_summary = _df.groupby('product', observed=True)['balance'].sum()
+    fig.add_trace(
+        go.Pie(labels=product_summary.index,
+               values=product_summary.values,
+               hole=0.4),
+        row=1, col=2,
+    )
+
+    fig.update_xaxes(title_text="만기 버킷", row=1, col=1)
+    fig.update_yaxes(title_text="잔액 (조)", row=1, col=1)
+    fig.update_layout(height=300)
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _hqla_fig(pos_key, _df) -> go.Figure:
+    """HQLA 항목별 잔액 바 Figure를 포지션 해시로 캐시합니다."""
+    fig = go.Figure(data=[
+        go.Bar(x=_df['product'].astype(str),
+               y=_df['balance']/1e9,
+               marker_color='#19c37d')
+    ])
+    fig.update_layout(
+        title="HQLA 항목별 잔액",
+        xaxis_title="항목",
+        yaxis_title="잔액 (조)",
+        height=350
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _maturity_compare_fig(pos_key, _positions) -> go.Figure:
+    """자산-부채 만기 구조 비교 바 Figure를 포지션 해시로 캐시합니다."""
+    assets_by_bucket = _positions[_positions["type"] == "asset"].groupby('maturity_bucket', observed=True)['balance'].sum()
+    liabs_by_bucket = _positions[_positions["type"] == "liability"].groupby('maturity_bucket', observed=True)['balance'].sum()
+
+    all_buckets = sorted(assets_by_bucket.index.union(liabs_by_bucket.index),
+                         key=lambda x: _BUCKET_RANK.get(x, len(BUCKET_ORDER)))
+
+    a_by_bucket = assets_by_bucket.reindex(all_buckets, fill_value=0).to_numpy() / 1e9
+    l_by_bucket = liabs_by_bucket.reindex(all_buckets, fill_value=0).to_numpy() / 1e9
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        name='자산',
+        x=all_buckets,
+        y=a_by_bucket,
+        marker_color='#7fb6ff'
+    ))
+    fig.add_trace(go.Bar(
+        name='부채',
+        x=all_buckets,
+        y=l_by_bucket,
+        marker_color='#c9ced6'
+    ))
+    fig.update_layout(
+        title="만기 버킷별 자산-부채 비교",
+        xaxis_title="만기 버킷",
+        yaxis_title="잔액 (조)",
+        barmode='group',
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _lcr_trend_figs(lcr_key, _df, use_original) -> Tuple[go.Figure, go.Figure]:
+    """LCR 추이·구성요소 Figure 쌍을 데이터 내용 해시로 캐시합니다.
+
+    무관한 슬라이더 변경에 의한 rerun에서 Plotly figure JSON
+    재생성(수백 ms)을 건너뜁니다. _df는 해시에서 제외되고
+    lcr_key가 캐시 키 역할을 합니다.
+    """
+    # 차트용 y값은 float32로 전달 — 직렬화 바이트 절감 (표시 전용 캐스팅)
+    # x축 일자 리스트는 한 번만 만들어 두 차트가 공유
+    lcr_days = _df["일자"].tolist()
+    fig_lcr = go.Figure()
+
+    # 트레이스를 모아 add_traces 한 번으로 추가 (trace별 검증/복사 비용 절감)
+    lcr_traces = []
+
+    # 원본 LCR 라인
+    if "원본LCR(%)" in _df.columns and use_original:
+        lcr_traces.append(go.Scatter(
+            x=lcr_days,
+            y=_df["원본LCR(%)"].to_numpy(np.float32),
+            name="원본 LCR (Excel)",
+            mode="lines+markers",
+            line=dict(color="#94a3b8", width=2, dash="dash"),
+            marker=dict(size=4)
+        ))
+
+    # 기본 계산 LCR 라인
+    lcr_traces.append(go.Scatter(
+        x=lcr_days,
+        y=_df["LCR(%)"].to_numpy(np.float32),
+        name="기본 LCR(%)",
+        mode="lines+markers",
+        line=dict(color="#3b82f6", width=2),
+        marker=dict(size=4)
+    ))
+
+    if "조정LCR(%)" in _df.columns:
+        lcr_traces.append(go.Scatter(
+            x=lcr_days,
+            y=_df["조정LCR(%)"].to_numpy(np.float32),
+            name="조정 LCR (시뮬레이션 반영)",
+            mode="lines+markers",
+            line=dict(color="#10b981", width=3),
+            marker=dict(size=5)
+        ))
+
+    fig_lcr.add_traces(lcr_traces)
+
+    # 100% 기준선
+    fig_lcr.add_hline(y=100, line_dash="dash", line_color="red",
+                      annotation_text="규제 기준 (100%)",
+                      annotation_position="top right")
+
+    fig_lcr.update_layout(
+        title="일자별 LCR 예측 (원본 vs 시뮬레이션 반영)",
+        xaxis=dict(title="", tickangle=45, tickfont=dict(size=9)),
+        yaxis=dict(title="LCR(%)", showgrid=True, gridcolor="rgba(0,0,0,0.1)"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+        height=400,
+        hovermode="x unified"
+    )
+
+    # 구성요소 차트
+    fig_comp = go.Figure()
+
+    hqla_col = "조정HQLA" if "조정HQLA" in _df.columns else "고유동성자산(A)"
+
+    fig_comp.add_traces([
+        go.Scatter(
+            x=lcr_days,
+            y=_df[hqla_col].to_numpy(np.float32),
+            name="고유동성자산(A)",
+            mode="lines",
+            line=dict(color="#10b981", width=2),
+            fill="tozeroy",
+            fillcolor="rgba(16, 185, 129, 0.2)"
+        ),
+        go.Scatter(
+            x=lcr_days,
+            y=_df["현금유출(B)"].to_numpy(np.float32),
+            name="현금유출(B)",
+            mode="lines",
+            line=dict(color="#ef4444", width=2)
+        ),
+        go.Scatter(
+            x=lcr_days,
+            y=_df["현금유입(C)"].to_numpy(np.float32),
+            name="현금유입(C)",
+            mode="lines",
+            line=dict(color="#f59e0b", width=2)
+        ),
+        go.Scatter(
+            x=lcr_days,
+            y=_df["순유출(B-C)"].to_numpy(np.float32),
+            name="순유출(B-C)",
+            mode="lines",
+            line=dict(color="#8b5cf6", width=2, dash="dash")
+        ),
+    ])
+
+    fig_comp.update_layout(
+        title="일자별 구성요소 추이",
+        xaxis=dict(title="", tickangle=45, tickfont=dict(size=9)),
+        yaxis=dict(title="금액(조)"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+        height=400,
+        hovermode="x unified"
+    )
+
+    return fig_lcr, fig_comp
+
+
+@st.cache_data(show_spinner=False)
+def _rate_gap_structure_fig(rsa_3m, rsa_12m, rsl_3m, rsl_12m) -> go.Figure:
+    """RSA/RSL 비교 바 차트를 갭 집계 값으로 캐시합니다."""
+    fig = go.Figure()
+    fig.add_traces([
+        go.Bar(
+            name="RSA (금리민감자산)",
+            x=["3개월", "12개월"],
+            y=[rsa_3m/1e12, rsa_12m/1e12],
+            marker_color="#3b82f6",
+            text=[f"{rsa_3m/1e12:,.1f}조", f"{rsa_12m/1e12:,.1f}조"],
+            textposition="outside"
+        ),
+        go.Bar(
+            name="RSL (금리민감부채)",
+            x=["3개월", "12개월"],
+            y=[rsl_3m/1e12, rsl_12m/1e12],
+            marker_color="#ef4444",
+            text=[f"{rsl_3m/1e12:,.1f}조", f"{rsl_12m/1e12:,.1f}조"],
+            textposition="outside"
+        ),
+    ])
+    fig.update_layout(
+        title="금리민감 자산/부채 비교",
+        barmode="group",
+        xaxis_title="금리재조정 기간",
+        yaxis_title="금액 (조)",
+        height=400,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _nii_split_pie(impact_3m, impact_6m_12m) -> go.Figure:
+    """NII 변동 구성 파이 차트를 두 영향 값으로 캐시합니다."""
+    fig = go.Figure(data=[go.Pie(
+        labels=["3M 갭 영향", "6-12M 갭 영향"],
+        values=[abs(impact_3m), abs(impact_6m_12m)],
+        hole=0.4,
+        marker_colors=["#3b82f6", "#8b5cf6"]
+    )])
+    fig.update_layout(
+        title="NII 변동 구성",
+        height=250,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _nii_scenario_fig(labels, values, horizon) -> go.Figure:
+    """금리 시나리오별 NII 변동 바 차트를 (라벨, 값, 기간) 튜플로 캐시합니다."""
+    # 막대 색/라벨은 C 레벨 벡터 연산으로 일괄 생성 (원소별 f-string 제거)
+    values_arr = np.asarray(values, dtype=float)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=list(labels),
+        y=values_arr,
+        marker_color=np.where(values_arr < 0, "#ef4444", "#10b981").tolist(),
+        text=np.char.mod("%+.2f", values_arr).tolist(),
+        textposition="outside"
+    ))
+    fig.update_layout(
+        title=f"금리 시나리오별 NII 변동 ({horizon}개월)",
+        xaxis_title="금리 시나리오",
+        yaxis_title="NII 변동 (조)",
+        height=400
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _scenario_bar_fig(labels, values, title, y_title, color) -> go.Figure:
+    """시나리오 비교용 단일 바 차트를 (라벨, 값) 튜플로 캐시합니다."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=list(labels),
+        y=list(values),
+        name=title.split()[-1],
+        marker_color=color
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="시나리오",
+        yaxis_title=y_title,
+        height=350
+    )
+    return fig
+
+
+@st.cache_data(show_spinner=False)
+def _rate_gap_info(pos_key, _positions) -> Dict[str, float]:
+    """전체 금리갭 집계를 포지션 해시로 캐시합니다."""
+    return calculate_aggregate_rate_gap(_positions)
+
+
+@st.cache_data(show_spinner=False)
+def _rate_gap_summary(pos_key, _positions) -> pd.DataFrame:
+    """상품별 금리갭 요약 테이블을 포지션 해시로 캐시합니다."""
+    return get_rate_gap_summary_table(_positions)
+
+
+@st.cache_data(show_spinner=False)
+def _nii_impact(pos_key, _positions, rate_shock_bp, horizon_months) -> Dict[str, float]:
+    """NII 시뮬레이션 결과를 (포지션 해시, 충격, 기간)으로 캐시합니다.
+
+    다른 위젯 변경에 의한 rerun이나 동일 (shock, horizon) 재선택 시
+    금리갭 재집계를 건너뜁니다.
+    """
+    return simulate_nii_impact(_positions, rate_shock_bp, horizon_months)
+
+
+@st.cache_data(show_spinner=False)
+def _run_base_stress(pos_key, _positions, start_str, end_str, behavioral_items,
+                     stress_bp, valuation_date, cx, cy, lcr_h, stress_h):
+    """BASE/STRESS 현금흐름·KPI를 한 번 계산해 캐시합니다.
+
+    입력(포지션 해시, 기간, 행동 파라미터, 쇼크, 커브)이 같으면
+    무관한 위젯 변경에 의한 rerun에서 무거운 스케줄 빌드를 건너뜁니다.
+    _positions는 해시에서 제외되고 pos_key가 대신 캐시 키 역할을 합니다.
+    """
+    behavioral = dict(behavioral_items)
+    # BASE/STRESS는 서로 독립이고 커널이 numpy/pandas에 묶여 있어
+    # 스레드 2개로 동시에 계산해도 GIL 경합이 작다
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        fb = ex.submit(build_cashflow_schedule_fast,
+                       _positions, start_str, end_str, behavioral,
+                       rate_shock_bp=0.0, scenario="BASE")
+        fs = ex.submit(build_cashflow_schedule_fast,
+                       _positions, start_str, end_str, behavioral,
+                       rate_shock_bp=stress_bp, scenario="STRESS")
+        base_cf, stress_cf = fb.result(), fs.result()
+
+        kb = ex.submit(compute_kpis_pro, _positions, base_cf, valuation_date,
+                       list(cx), list(cy), lcr_h, stress_h)
+        ks = ex.submit(compute_kpis_pro, _positions, stress_cf, valuation_date,
+                       list(cx), list(cy), lcr_h, stress_h)
+        base_k, stress_k = kb.result(), ks.result()
+    return base_cf, stress_cf, base_k, stress_k
+
+
+
+
+def main():
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown('<div class="h1">🚀 ALM Visualizer PRO — Advanced Simulation Suite</div>', unsafe_allow_html=True)
+    st.markdown(
+        '<div class="sub">금리 시나리오 분석 | 행동비율 과부족 분석 | 민감도 분석 | 최적화 시뮬레이션 | DV01 | Yield Curve</div>',
+        unsafe_allow_html=True
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # =====================================================
+    # 🆕 Excel 파일 필수 검증 (하드코딩 데이터 사용 안함)
+    # =====================================================
+    # 존재 확인과 mtime 조회를 stat() 한 번으로 처리 (syscall 절약)
+    try:
+        excel_mtime = Path(DEFAULT_EXCEL_PATH).stat().st_mtime
+        excel_exists = True
+    except FileNotFoundError:
+        excel_exists, excel_mtime = False, None
+
+    if not excel_exists:
+        st.error(f"""
+        ## ❌ Excel 파일이 필요합니다
+        
+        **ALM_input_template.xlsx** 파일을 찾을 수 없습니다.
+        
+        ### 필요한 파일 위치:
+        - `{DEFAULT_EXCEL_PATH}`
+        
+        ### 필수 시트 목록:
+        1. **POSITIONS** - 자산/부채 포지션 데이터
+        2. **HQLA** - 고유동성자산 데이터
+        3. **YIELD_CURVE** - 금리 커브 (BASE, STRESS)
+        4. **BEHAVIORAL_PARAMS** - 행동 파라미터 (조기상환율, 재예치율 등)
+        5. **SCENARIOS** - 시나리오별 파라미터 설정
+        6. **ANALYSIS_CONFIG** - 분석 기간, Horizon 설정
+        7. **LCR_FORE** - LCR 예측 기초자료
+        
+        ### 해결 방법:
+        1. Excel 템플릿 파일을 현재 디렉토리에 위치시키세요.
+        2. 또는 아래에서 파일을 업로드하세요.
+        """)
+        
         # 파일 업로드 옵션
         uploaded_file = st.file_uploader("📁 Excel 파일 업로드", type=["xlsx"])
         if uploaded_file is not None:
-            # 업로드된 파일 저장
-            with open(DEFAULT_EXCEL_PATH, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.success("✅ 파일이 업로드되었습니다. 페이지를 새로고침하세요.")
-            st.rerun()
+            _save_uploaded(uploaded_file)
         return
     
-    # Excel 파일 유효성 검사
-    valid, validation_message = validate_excel_file(DEFAULT_EXCEL_PATH)
+    # Excel 파일 유효성 검사 (파일이 수정되지 않았으면 캐시 재사용)
+    valid, validation_message = cached_excel_validation(DEFAULT_EXCEL_PATH, excel_mtime)
     if not valid:
         st.error(f"""
         ## ❌ Excel 파일 검증 실패
@@ -3085,27 +3942,24 @@ def main():
         st.markdown("---")
         uploaded_file = st.file_uploader("📁 수정된 Excel 파일 업로드", type=["xlsx"])
         if uploaded_file is not None:
-            with open(DEFAULT_EXCEL_PATH, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            st.success("✅ 파일이 업로드되었습니다. 페이지를 새로고침하세요.")
-            st.rerun()
+            _save_uploaded(uploaded_file)
         return
     
     # =====================================================
     # 🆕 Excel에서 모든 기본값 로드 (하드코딩 없음)
     # =====================================================
     try:
-        # 시나리오 설정 로드
-        SCENARIO_DEFAULTS = load_scenarios_from_excel(DEFAULT_EXCEL_PATH)
-        
+        # 시나리오 설정 로드 (파일이 수정되지 않았으면 시트 재파싱 생략)
+        SCENARIO_DEFAULTS = cached_excel_scenarios(DEFAULT_EXCEL_PATH, excel_mtime)
+
         # 분석 설정 로드
-        analysis_config = load_analysis_config_from_excel(DEFAULT_EXCEL_PATH)
-        
+        analysis_config = cached_excel_analysis_config(DEFAULT_EXCEL_PATH, excel_mtime)
+
         # 기본 행동 파라미터 로드
-        excel_behavioral_defaults = load_behavioral_params_from_excel(DEFAULT_EXCEL_PATH)
-        
+        excel_behavioral_defaults = cached_excel_behavioral_params(DEFAULT_EXCEL_PATH, excel_mtime)
+
         # Yield Curve 로드
-        excel_yield_curve_x, excel_yield_curve_y = load_yield_curve_from_excel(DEFAULT_EXCEL_PATH, "BASE")
+        excel_yield_curve_x, excel_yield_curve_y = cached_excel_yield_curve(DEFAULT_EXCEL_PATH, excel_mtime, "BASE")
         
     except Exception as e:
         st.error(f"""
@@ -3117,19 +3971,10 @@ def main():
         """)
         return
     
-    # Excel Yield Curve를 테너별 기본값으로 변환
-    def get_excel_rate_for_tenor(tenor_years):
-        """Excel 커브에서 특정 테너의 금리를 가져옴"""
-        for i, x in enumerate(excel_yield_curve_x):
-            if abs(x - tenor_years) < 0.01:
-                return excel_yield_curve_y[i] * 100  # % 단위로 변환
-        # 선형 보간
-        return np.interp(tenor_years, excel_yield_curve_x, excel_yield_curve_y) * 100
-    
-    excel_r3m = get_excel_rate_for_tenor(0.25)
-    excel_r1y = get_excel_rate_for_tenor(1.0)
-    excel_r5y = get_excel_rate_for_tenor(5.0)
-    excel_r10y = get_excel_rate_for_tenor(10.0)
+    # Excel Yield Curve를 테너별 기본값으로 변환 (선형 보간, % 단위)
+    excel_r3m, excel_r1y, excel_r5y, excel_r10y = (
+        np.interp([0.25, 1.0, 5.0, 10.0], excel_yield_curve_x, excel_yield_curve_y) * 100
+    ).tolist()
 
     # 분석 기간 설정 (Excel에서 로드)
     start_date = pd.Timestamp(analysis_config['start_date'])
@@ -3191,51 +4036,59 @@ def main():
             defaults = scenario_defaults
         else:
             defaults = SCENARIO_DEFAULTS.get(default_scenario, scenario_defaults)
-        
+
+        # 기본값 float 캐스팅을 위젯마다 반복하지 않도록 한 번만 정규화
+        defaults_f = {k: (float(v) if isinstance(v, (int, float)) else v)
+                      for k, v in defaults.items()}
+        # 금리는 % 단위로 통일 (소수 비율로 저장된 경우 변환)
+        for _r in ("r_3m", "r_1y", "r_5y", "r_10y"):
+            if defaults_f[_r] < 1:
+                defaults_f[_r] *= 100
+
         # 탭 1: 행동비율 파라미터
         with var_tabs[0]:
             st.markdown("**📊 대출 관련**")
             loan_prepay_rate = st.slider("대출 조기상환율(연)", 0.0, 0.30, 
-                                         float(defaults["loan_prepay_rate"]), 
+                                         defaults_f["loan_prepay_rate"], 
                                          0.005, key="loan_prepay")
             loan_maturity_repay_rate = st.slider("대출 만기상환율", 0.50, 1.0, 
-                                                  float(defaults["loan_maturity_repay_rate"]), 
+                                                  defaults_f["loan_maturity_repay_rate"], 
                                                   0.05, key="loan_maturity")
             
             st.markdown("---")
             
             st.markdown("**💳 차입 및 약정**")
             borrow_refinance_rate = st.slider("차입 차환율", 0.30, 1.0, 
-                                               float(defaults["borrow_refinance_rate"]), 
+                                               defaults_f["borrow_refinance_rate"], 
                                                0.05, key="borrow_ref")
             credit_line_usage_rate = st.slider("신용약정 추가사용률(연)", 0.0, 0.15, 
-                                                float(defaults["credit_line_usage_rate"]), 
+                                                defaults_f["credit_line_usage_rate"], 
                                                 0.005, key="credit_usage")
             guarantee_usage_rate = st.slider("지급보증 추가사용률(연)", 0.0, 0.15, 
-                                              float(defaults["guarantee_usage_rate"]), 
+                                              defaults_f["guarantee_usage_rate"], 
                                               0.005, key="guarantee_usage")
             
             st.markdown("---")
             
             st.markdown("**🏦 예금 관련**")
             core_deposit_ratio = st.slider("핵심예금비율", 0.20, 0.90, 
-                                            float(defaults["core_deposit_ratio"]), 
+                                            defaults_f["core_deposit_ratio"], 
                                             0.05, key="core_deposit")
             deposit_rollover_rate = st.slider("만기재예치율", 0.20, 1.0, 
-                                               float(defaults["deposit_rollover_rate"]), 
+                                               defaults_f["deposit_rollover_rate"], 
                                                0.05, key="deposit_rollover")
             deposit_early_withdraw_rate = st.slider("중도해지율(연)", 0.0, 0.30, 
-                                                     float(defaults["deposit_early_withdraw_rate"]), 
+                                                     defaults_f["deposit_early_withdraw_rate"], 
                                                      0.005, key="deposit_early")
             
             st.markdown("---")
             
             st.markdown("**⚙️ 기타**")
             runoff_rate = st.slider("일반 유출율(연)", 0.0, 0.30, 
-                                     float(defaults["runoff_rate"]), 
+                                     defaults_f["runoff_rate"], 
                                      0.005, key="runoff")
             early_termination = st.slider("조기종료율(연)", 0.0, 0.30, 
-                                           float(defaults["early_termination"]), 
+                                           defaults_f["early_termination"], 
                                            0.005, key="early_term")
         
         # 탭 2: Yield Curve
@@ -3245,16 +4098,16 @@ def main():
             
             # 시나리오별 금리 사용 (이미 % 단위로 저장됨)
             r_3m = st.number_input("3M 금리(%)", 0.0, 15.0, 
-                                    float(defaults["r_3m"]) * 100 if defaults["r_3m"] < 1 else float(defaults["r_3m"]), 
+                                    defaults_f["r_3m"], 
                                     0.1, key="r3m") / 100.0
             r_1y = st.number_input("1Y 금리(%)", 0.0, 15.0, 
-                                    float(defaults["r_1y"]) * 100 if defaults["r_1y"] < 1 else float(defaults["r_1y"]), 
+                                    defaults_f["r_1y"], 
                                     0.1, key="r1y") / 100.0
             r_5y = st.number_input("5Y 금리(%)", 0.0, 15.0, 
-                                    float(defaults["r_5y"]) * 100 if defaults["r_5y"] < 1 else float(defaults["r_5y"]), 
+                                    defaults_f["r_5y"], 
                                     0.1, key="r5y") / 100.0
             r_10y = st.number_input("10Y 금리(%)", 0.0, 15.0, 
-                                     float(defaults["r_10y"]) * 100 if defaults["r_10y"] < 1 else float(defaults["r_10y"]), 
+                                     defaults_f["r_10y"], 
                                      0.1, key="r10y") / 100.0
             
             curve_x = [0.25, 1.0, 5.0, 10.0]
@@ -3271,12 +4124,7 @@ def main():
                 line=dict(color='#3b82f6', width=2),
                 marker=dict(size=8)
             ))
-            curve_fig.update_layout(
-                xaxis_title="만기(년)",
-                yaxis_title="금리(%)",
-                height=200,
-                margin=dict(t=10, b=30, l=40, r=10)
-            )
+            curve_fig.update_layout(**_YC_LAYOUT)
             st.plotly_chart(curve_fig, use_container_width=True)
         
         # 탭 3: 기타 설정
@@ -3287,12 +4135,20 @@ def main():
             
             st.markdown("**금리 쇼크**")
             stress_shock_bp = st.slider("STRESS 금리쇼크(bp)", 0, 500, 
-                                         int(defaults["stress_shock_bp"]), 
+                                         int(defaults_f["stress_shock_bp"]), 
                                          25, key="stress_shock")
             
             st.markdown("**분석 기간**")
             lcr_h = st.slider("LCR Horizon(일)", 10, 60, default_lcr_h, 5, key="lcr_h")
             stress_h = st.slider("Stress Horizon(일)", 30, 180, default_stress_h, 10, key="stress_h")
+
+            st.markdown("**재계산 모드**")
+            # 끄면 슬라이더를 여러 개 조정한 뒤 버튼 한 번으로만 무거운
+            # BASE/STRESS 계산을 수행 (드래그 중 rerun마다 계산하지 않음)
+            auto_recalc = st.toggle("⚡ 자동 재계산", value=True, key="auto_recalc")
+            manual_run = False
+            if not auto_recalc:
+                manual_run = st.button("▶️ 지금 재계산", use_container_width=True, key="manual_run")
             
             st.markdown("**분석 기간 (Excel에서 로드)**")
             st.info(f"시작일: {start_date.date()} | 종료일: {end_date.date()} | 평가일: {valuation_date.date()}")
@@ -3312,32 +4168,27 @@ def main():
         
         st.info("💡 슬라이더를 조정하면 모든 분석에 즉시 반영됩니다.")
         
-        # 세션에 저장
-        st.session_state["_loan_prepay_rate"] = float(loan_prepay_rate)
-        st.session_state["_loan_maturity_repay_rate"] = float(loan_maturity_repay_rate)
-        st.session_state["_borrow_refinance_rate"] = float(borrow_refinance_rate)
-        st.session_state["_credit_line_usage_rate"] = float(credit_line_usage_rate)
-        st.session_state["_guarantee_usage_rate"] = float(guarantee_usage_rate)
-        st.session_state["_core_deposit_ratio"] = float(core_deposit_ratio)
-        st.session_state["_deposit_rollover_rate"] = float(deposit_rollover_rate)
-        st.session_state["_deposit_early_withdraw_rate"] = float(deposit_early_withdraw_rate)
-        st.session_state["_runoff_rate"] = float(runoff_rate)
-        st.session_state["_early_term"] = float(early_termination)
-        st.session_state["_current_scenario"] = scenario_type
-        
+        # 슬라이더는 이미 float을 반환하므로 재캐스팅 없이 한 번에 구성
         behavioral = {
-            "loan_prepay_rate": float(loan_prepay_rate),
-            "loan_maturity_repay_rate": float(loan_maturity_repay_rate),
-            "borrow_refinance_rate": float(borrow_refinance_rate),
-            "credit_line_usage_rate": float(credit_line_usage_rate),
-            "guarantee_usage_rate": float(guarantee_usage_rate),
-            "core_deposit_ratio": float(core_deposit_ratio),
-            "deposit_rollover_rate": float(deposit_rollover_rate),
-            "deposit_early_withdraw_rate": float(deposit_early_withdraw_rate),
-            "runoff_rate": float(runoff_rate),
-            "early_termination": float(early_termination),
+            "loan_prepay_rate": loan_prepay_rate,
+            "loan_maturity_repay_rate": loan_maturity_repay_rate,
+            "borrow_refinance_rate": borrow_refinance_rate,
+            "credit_line_usage_rate": credit_line_usage_rate,
+            "guarantee_usage_rate": guarantee_usage_rate,
+            "core_deposit_ratio": core_deposit_ratio,
+            "deposit_rollover_rate": deposit_rollover_rate,
+            "deposit_early_withdraw_rate": deposit_early_withdraw_rate,
+            "runoff_rate": runoff_rate,
+            "early_termination": early_termination,
         }
 
+        # 세션에 일괄 저장 (키별 __setitem__ 반복 대신 update 한 번)
+        st.session_state.update(
+            {f"_{k}": v for k, v in behavioral.items() if k != "early_termination"},
+            _early_term=early_termination,
+            _current_scenario=scenario_type,
+        )
+
     # -----------------------------
     # A) 데이터 로드 (Excel 필수)
     # -----------------------------
@@ -3346,8 +4197,8 @@ def main():
     
     # Excel에서 포지션 데이터 로드
     try:
-        positions = load_positions_from_excel(DEFAULT_EXCEL_PATH)
-        
+        positions = cached_excel_positions(DEFAULT_EXCEL_PATH, excel_mtime)
+
         asset_count = len(positions[positions['type'] == 'asset'])
         liab_count = len(positions[positions['type'] == 'liability'])
         hqla_count = len(positions[positions['type'] == 'hqla'])
@@ -3361,7 +4212,8 @@ def main():
     st.markdown("</div>", unsafe_allow_html=True)
     
     # 상품 필터 (전체 표시)
-    positions_f = positions.copy()
+    # 필터가 없으므로 복사 대신 참조 (하류는 모두 읽기 전용)
+    positions_f = positions
 
     # 시뮬레이션 기간 계산
     total_days = (end_date - start_date).days
@@ -3371,26 +4223,25 @@ def main():
     # -----------------------------
     # 진행바를 표시하지 않고 백그라운드에서 계산
     with st.spinner("🔄 BASE/STRESS 시나리오 계산 중..."):
-        base_cf = build_cashflow_schedule_fast(
-            positions_f, str(start_date.date()), str(end_date.date()),
-            behavioral, rate_shock_bp=0.0, scenario="BASE"
-        )
-
-        stress_cf = build_cashflow_schedule_fast(
-            positions_f, str(start_date.date()), str(end_date.date()),
-            behavioral, rate_shock_bp=float(stress_shock_bp), scenario="STRESS"
-        )
-
-        base_k = compute_kpis_pro(
-            positions_f, base_cf, valuation_date, curve_x, curve_y, int(lcr_h), int(stress_h)
-        )
+        pos_key = _positions_key(positions_f)
+        # 자동 재계산이 꺼져 있으면 버튼을 누를 때까지 마지막 결과를 재사용
+        if auto_recalc or manual_run or "_last_run" not in st.session_state:
+            st.session_state["_last_run"] = _run_base_stress(
+                pos_key, positions_f, str(start_date.date()), str(end_date.date()),
+                tuple(sorted(behavioral.items())), float(stress_shock_bp),
+                valuation_date, tuple(curve_x), tuple(curve_y), int(lcr_h), int(stress_h)
+            )
+            # 결과를 만든 입력을 함께 저장 — 수동 재계산 모드에서 위젯이
+            # 움직여도 하류 캐시 키가 항상 저장된 결과와 일치하도록
+            st.session_state["_last_run_key"] = (
+                pos_key, str(start_date.date()), str(end_date.date()),
+                tuple(sorted(behavioral.items())),
+            )
+        base_cf, stress_cf, base_k, stress_k = st.session_state["_last_run"]
 
-        stress_k = compute_kpis_pro(
-            positions_f, stress_cf, valuation_date, curve_x, curve_y, int(lcr_h), int(stress_h)
-        )
-        
         # CF 결과를 cashflows_df로 참조 (CF 결과 분석 탭에서 사용)
-        cashflows_df = base_cf.copy()
+        # 하류 코드는 모두 읽기 전용(groupby/to_csv/head)이라 복사 불필요
+        cashflows_df = base_cf
 
     delta = {k: float(stress_k.get(k, 0.0) - base_k.get(k, 0.0)) for k in stress_k.keys()}
 
@@ -3441,56 +4292,37 @@ def main():
         else:
             return '<span style="color:#ef4444;font-weight:700;">✗ 위험</span>'
     
-    st.markdown(f"""
+    # 정적 CSS는 모듈 상수 그대로 내보내고, 동적인 부분만 f-string으로 조립
+    dot_green = '<span style="color:#10b981;">●</span>'
+    dot_red = '<span style="color:#ef4444;">●</span>'
+    dot_amber = '<span style="color:#f59e0b;">●</span>'
+    # 포맷 함수 호출 결과를 셀 딕셔너리로 한 번만 계산한 뒤 템플릿에 치환
+    cells = {}
+    for k in ("HQLA", "NII_YTD", "NPV"):
+        cells[f"b_{k}"] = fmt_조(base_k[k])
+        cells[f"s_{k}"] = fmt_조(stress_k[k])
+        cells[f"d_{k}"] = fmt_delta(delta[k], fmt_조)
+    cells.update(
+        st_HQLA=fmt_survive(1 if base_k["HQLA"] > 0 else 0),
+        st_NII=dot_green if base_k["NII_YTD"] > 0 else dot_red,
+        st_NPV=dot_green if base_k["NPV"] >= 0 else dot_amber,
+        b_DV01=f'{base_k["DV01_NET"]/1e8:+.2f}억/bp',
+        s_DV01=f'{stress_k["DV01_NET"]/1e8:+.2f}억/bp',
+        dv01_asset=f'{base_k["DV01_ASSET"]/1e8:+.1f}',
+        dv01_liab=f'{base_k["DV01_LIAB"]/1e8:+.1f}',
+        st_DV01=dot_green if abs(base_k["DV01_NET"]) < 1e10 else dot_amber,
+        b_LCR=fmt_lcr_display(base_k["LCR"]),
+        s_LCR=fmt_lcr_display(stress_k["LCR"]),
+        outflow_30d=fmt_조(base_k["NetOutflow_30D"]),
+        st_LCR=fmt_survive(1 if base_k["LCR"] >= 1.0 else 0),
+        b_SURV=fmt_survive(base_k["Stress_Survive"]),
+        s_SURV=fmt_survive(stress_k["Stress_Survive"]),
+        stress_h=stress_h,
+    )
+    kpi_rows = _KPI_ROWS_TEMPLATE.format(**cells)
+
+    st.markdown(_KPI_TABLE_CSS + f"""
     <style>
-    .kpi-table {{
-        width: 100%;
-        border-collapse: separate;
-        border-spacing: 0;
-        font-size: 13px;
-    }}
-    .kpi-table th {{
-        background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%);
-        padding: 10px 12px;
-        text-align: center;
-        font-weight: 700;
-        color: #475569;
-        border-bottom: 2px solid #e2e8f0;
-    }}
-    .kpi-table th:first-child {{
-        text-align: left;
-        border-radius: 8px 0 0 0;
-    }}
-    .kpi-table th:last-child {{
-        border-radius: 0 8px 0 0;
-    }}
-    .kpi-table td {{
-        padding: 12px;
-        text-align: center;
-        border-bottom: 1px solid #f1f5f9;
-    }}
-    .kpi-table td:first-child {{
-        text-align: left;
-        font-weight: 600;
-        color: #334155;
-        background: #fafbfc;
-    }}
-    .kpi-table tr:last-child td {{
-        border-bottom: none;
-    }}
-    .kpi-table tr:last-child td:first-child {{
-        border-radius: 0 0 0 8px;
-    }}
-    .kpi-table .val-base {{
-        font-weight: 700;
-        color: #1e40af;
-        font-size: 14px;
-    }}
-    .kpi-table .val-stress {{
-        font-weight: 700;
-        color: #9333ea;
-        font-size: 14px;
-    }}
     .scenario-header {{
         display: flex;
         justify-content: space-between;
@@ -3502,7 +4334,7 @@ def main():
         border-radius: 10px;
     }}
     </style>
-    
+
     <div class="scenario-header">
         <span style="font-size: 15px; font-weight: 800; color: {scenario_color};">
             {scenario_icon} {current_scenario}
@@ -3511,7 +4343,7 @@ def main():
             금리쇼크 +{stress_shock_bp}bp | 예금유출 {deposit_early_withdraw_rate*100:.1f}% | 핵심예금 {core_deposit_ratio*100:.0f}%
         </span>
     </div>
-    
+
     <table class="kpi-table">
         <thead>
             <tr>
@@ -3522,53 +4354,7 @@ def main():
                 <th style="width:16%;">상태</th>
             </tr>
         </thead>
-        <tbody>
-            <tr>
-                <td>💰 HQLA</td>
-                <td class="val-base">{fmt_조(base_k["HQLA"])}</td>
-                <td class="val-stress">{fmt_조(stress_k["HQLA"])}</td>
-                <td>{fmt_delta(delta["HQLA"], fmt_조)}</td>
-                <td>{fmt_survive(1) if base_k["HQLA"] > 0 else fmt_survive(0)}</td>
-            </tr>
-            <tr>
-                <td>📈 NII (순이자수익)</td>
-                <td class="val-base">{fmt_조(base_k["NII_YTD"])}</td>
-                <td class="val-stress">{fmt_조(stress_k["NII_YTD"])}</td>
-                <td>{fmt_delta(delta["NII_YTD"], fmt_조)}</td>
-                <td>{'<span style="color:#10b981;">●</span>' if base_k["NII_YTD"] > 0 else '<span style="color:#ef4444;">●</span>'}</td>
-            </tr>
-            <tr>
-                <td>💎 NPV (순현재가치)</td>
-                <td class="val-base">{fmt_조(base_k["NPV"])}</td>
-                <td class="val-stress">{fmt_조(stress_k["NPV"])}</td>
-                <td>{fmt_delta(delta["NPV"], fmt_조)}</td>
-                <td>{'<span style="color:#10b981;">●</span>' if base_k["NPV"] >= 0 else '<span style="color:#f59e0b;">●</span>'}</td>
-            </tr>
-            <tr>
-                <td>📊 DV01 (Net)</td>
-                <td class="val-base">{base_k["DV01_NET"]/1e8:+.2f}억/bp</td>
-                <td class="val-stress">{stress_k["DV01_NET"]/1e8:+.2f}억/bp</td>
-                <td><span style="color:#64748b;font-size:11px;">자산 {base_k["DV01_ASSET"]/1e8:+.1f} / 부채 {base_k["DV01_LIAB"]/1e8:+.1f}</span></td>
-                <td>{'<span style="color:#10b981;">●</span>' if abs(base_k["DV01_NET"]) < 1e10 else '<span style="color:#f59e0b;">●</span>'}</td>
-            </tr>
-            <tr>
-                <td>🏦 LCR</td>
-                <td class="val-base">{fmt_lcr_display(base_k["LCR"])}</td>
-                <td class="val-stress">{fmt_lcr_display(stress_k["LCR"])}</td>
-                <td><span style="color:#64748b;font-size:11px;">30일유출 {fmt_조(base_k["NetOutflow_30D"])}</span></td>
-                <td>{fmt_survive(1) if base_k["LCR"] >= 1.0 else fmt_survive(0)}</td>
-            </tr>
-            <tr>
-                <td>🛡️ Stress 생존</td>
-                <td class="val-base">{fmt_survive(base_k["Stress_Survive"])}</td>
-                <td class="val-stress">{fmt_survive(stress_k["Stress_Survive"])}</td>
-                <td colspan="2" style="text-align:center;">
-                    <span style="font-size:11px;color:#64748b;">
-                        {stress_h}일 스트레스 테스트 기준
-                    </span>
-                </td>
-            </tr>
-        </tbody>
+        <tbody>{kpi_rows}</tbody>
     </table>
     """, unsafe_allow_html=True)
     
@@ -3580,132 +4366,18 @@ def main():
     st.markdown('<div class="card">', unsafe_allow_html=True)
     
     comp_col1, comp_col2 = st.columns(2)
-    
+
+    # 구성은 positions에만 의존 → 포지션 해시 키로 Figure 캐시 재사용
+    fig_asset, fig_liab = _composition_figs(pos_key, positions_f)
+
     # 자산 구성 (Asset Composition)
     with comp_col1:
-        assets_for_pie = positions_f[positions_f["type"] == "asset"].copy()
-        
-        # 상품 카테고리 분류
-        def categorize_asset(product):
-            product_lower = product.lower()
-            if "국채" in product or "gov" in product_lower:
-                return "Gov Bond"
-            elif "카드" in product or "credit" in product_lower or "리볼빙" in product:
-                return "Credit Card"
-            elif "가계" in product or "household" in product_lower:
-                return "Household Loan"
-            elif "mortgage" in product_lower or "주택" in product:
-                return "Mortgage"
-            elif "기업" in product or "corporate" in product_lower:
-                return "Corporate Loan"
-            elif "채권" in product or "bond" in product_lower:
-                return "Corporate Bond"
-            else:
-                return "Other"
-        
-        assets_for_pie["category"] = assets_for_pie["product"].apply(categorize_asset)
-        asset_comp = assets_for_pie.groupby("category")["balance"].sum().reset_index()
-        
-        # 색상 매핑 (파란색 계열)
-        asset_colors = {
-            "Gov Bond": "#00bcd4",      # 청록색
-            "Credit Card": "#4fc3f7",   # 밝은 파랑
-            "Household Loan": "#2196f3", # 파랑
-            "Mortgage": "#1565c0",      # 진한 파랑
-            "Corporate Loan": "#0d47a1", # 아주 진한 파랑
-            "Corporate Bond": "#64b5f6", # 연한 파랑
-            "Other": "#90caf9"          # 매우 연한 파랑
-        }
-        
-        fig_asset = go.Figure(data=[go.Pie(
-            labels=asset_comp["category"],
-            values=asset_comp["balance"],
-            hole=0.6,
-            marker=dict(colors=[asset_colors.get(cat, "#7fb6ff") for cat in asset_comp["category"]]),
-            textinfo="none",
-            hovertemplate="<b>%{label}</b><br>%{value:,.0f}<br>%{percent}<extra></extra>"
-        )])
-        
-        fig_asset.update_layout(
-            title=dict(text="ASSET COMPOSITION", font=dict(size=14, color="#073763", family="Arial Black")),
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.2,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=10)
-            ),
-            margin=dict(t=40, b=80, l=20, r=20),
-            height=320,
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)"
-        )
-        
         st.plotly_chart(fig_asset, use_container_width=True)
-    
+
     # 부채 구성 (Liability Composition)
     with comp_col2:
-        liabs_for_pie = positions_f[positions_f["type"] == "liability"].copy()
-        
-        # 상품 카테고리 분류
-        def categorize_liability(product):
-            product_lower = product.lower()
-            if "회사채" in product or "corporate bond" in product_lower:
-                return "Corporate Bond"
-            elif "차입" in product or "borrow" in product_lower:
-                return "Borrowing"
-            elif "저축" in product or "saving" in product_lower:
-                return "Savings"
-            elif "요구불" in product or "demand" in product_lower or "MMDA" in product:
-                return "Demand Deposit"
-            elif "정기" in product or "time" in product_lower or "예금" in product:
-                return "Time Deposit"
-            else:
-                return "Other"
-        
-        liabs_for_pie["category"] = liabs_for_pie["product"].apply(categorize_liability)
-        liab_comp = liabs_for_pie.groupby("category")["balance"].sum().reset_index()
-        
-        # 색상 매핑 (주황/갈색 계열)
-        liab_colors = {
-            "Corporate Bond": "#ff9800",   # 주황색
-            "Borrowing": "#e65100",        # 진한 주황
-            "Savings": "#8d6e63",          # 갈색
-            "Demand Deposit": "#a1887f",   # 연한 갈색
-            "Time Deposit": "#4e342e",     # 진한 갈색
-            "Other": "#bcaaa4"             # 매우 연한 갈색
-        }
-        
-        fig_liab = go.Figure(data=[go.Pie(
-            labels=liab_comp["category"],
-            values=liab_comp["balance"],
-            hole=0.6,
-            marker=dict(colors=[liab_colors.get(cat, "#ff9f1a") for cat in liab_comp["category"]]),
-            textinfo="none",
-            hovertemplate="<b>%{label}</b><br>%{value:,.0f}<br>%{percent}<extra></extra>"
-        )])
-        
-        fig_liab.update_layout(
-            title=dict(text="LIABILITY COMPOSITION", font=dict(size=14, color="#073763", family="Arial Black")),
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=-0.2,
-                xanchor="center",
-                x=0.5,
-                font=dict(size=10)
-            ),
-            margin=dict(t=40, b=80, l=20, r=20),
-            height=320,
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)"
-        )
-        
         st.plotly_chart(fig_liab, use_container_width=True)
-    
+
     st.markdown("</div>", unsafe_allow_html=True)
 
     # -----------------------------
@@ -3721,31 +4393,22 @@ def main():
     bucket_labels = ["0-3M", "3-6M", "6-12M", "1-3Y", "3-5Y", ">5Y"]
     bucket_map = {"3M": "0-3M", "6M": "3-6M", "1Y": "6-12M", "2Y": "1-3Y", "3Y": "3-5Y", "5Y+": ">5Y"}
     
-    assets_by_bucket = positions_f[positions_f["type"] == "asset"].copy()
-    assets_by_bucket["bucket_label"] = assets_by_bucket["maturity_bucket"].map(bucket_map)
-    asset_bucket_sum = assets_by_bucket.groupby("bucket_label")["balance"].sum()
-    
-    liabs_by_bucket = positions_f[positions_f["type"] == "liability"].copy()
-    liabs_by_bucket["bucket_label"] = liabs_by_bucket["maturity_bucket"].map(bucket_map)
-    liab_bucket_sum = liabs_by_bucket.groupby("bucket_label")["balance"].sum()
-    
-    # 버킷별 Gap 계산
-    gap_data = []
-    cumulative_gap = 0
-    for bucket in bucket_labels:
-        asset_val = asset_bucket_sum.get(bucket, 0) / 1e9  # 천원 단위로 변환 (k)
-        liab_val = liab_bucket_sum.get(bucket, 0) / 1e9
-        gap = asset_val - liab_val
-        cumulative_gap += gap
-        gap_data.append({
-            "bucket": bucket,
-            "asset": asset_val,
-            "liability": liab_val,
-            "gap": gap,
-            "cumulative": cumulative_gap
-        })
+    asset_bucket_sum, liab_bucket_sum = _bucket_sums(
+        pos_key, positions_f, "maturity_bucket", tuple(bucket_map.items())
+    )
     
-    gap_df = pd.DataFrame(gap_data)
+    # 버킷별 Gap 계산 (reindex + cumsum 한 번의 벡터 패스)
+    bucket_idx = pd.Index(bucket_labels)
+    a_vec = asset_bucket_sum.reindex(bucket_idx, fill_value=0).to_numpy(dtype=float) / 1e9  # 천원 단위 (k)
+    l_vec = liab_bucket_sum.reindex(bucket_idx, fill_value=0).to_numpy(dtype=float) / 1e9
+    gap_vec = a_vec - l_vec
+    gap_df = pd.DataFrame({
+        "bucket": bucket_labels,
+        "asset": a_vec,
+        "liability": l_vec,
+        "gap": gap_vec,
+        "cumulative": np.cumsum(gap_vec),
+    })
     
     # Liquidity Gap Analysis (왼쪽)
     with risk_col1:
@@ -3756,7 +4419,7 @@ def main():
             x=gap_df["bucket"],
             y=gap_df["gap"],
             name="Gap",
-            marker_color=["#3b82f6" if g >= 0 else "#3b82f6" for g in gap_df["gap"]],
+            marker_color="#3b82f6",
             yaxis="y"
         ))
         
@@ -3825,39 +4488,26 @@ def main():
         # rate_maturity 기반 재조정 갭 계산
         repricing_bucket_map = {"3M": "0-3M", "6M": "3-6M", "1Y": "6-12M", "2Y": "1-3Y", "3Y": "3-5Y"}
         
-        # 자산 금리 재조정
-        assets_repricing = positions_f[positions_f["type"] == "asset"].copy()
-        if "rate_maturity" in assets_repricing.columns:
-            assets_repricing["repricing_bucket"] = assets_repricing["rate_maturity"].map(repricing_bucket_map)
+        # 자산/부채 금리 재조정 (rate_maturity 없으면 만기 버킷으로 폴백)
+        if "rate_maturity" in positions_f.columns:
+            rep_col, rep_map = "rate_maturity", repricing_bucket_map
         else:
-            assets_repricing["repricing_bucket"] = assets_repricing["maturity_bucket"].map(bucket_map)
-        asset_repricing_sum = assets_repricing.groupby("repricing_bucket")["balance"].sum()
-        
-        # 부채 금리 재조정
-        liabs_repricing = positions_f[positions_f["type"] == "liability"].copy()
-        if "rate_maturity" in liabs_repricing.columns:
-            liabs_repricing["repricing_bucket"] = liabs_repricing["rate_maturity"].map(repricing_bucket_map)
-        else:
-            liabs_repricing["repricing_bucket"] = liabs_repricing["maturity_bucket"].map(bucket_map)
-        liab_repricing_sum = liabs_repricing.groupby("repricing_bucket")["balance"].sum()
-        
-        # 재조정 갭 데이터
-        repricing_data = []
-        cumulative_repricing = 0
-        for bucket in bucket_labels:
-            asset_val = asset_repricing_sum.get(bucket, 0) / 1e9
-            liab_val = liab_repricing_sum.get(bucket, 0) / 1e9
-            gap = asset_val - liab_val
-            cumulative_repricing += gap
-            repricing_data.append({
-                "bucket": bucket,
-                "asset": asset_val,
-                "liability": liab_val,
-                "gap": gap,
-                "cumulative": cumulative_repricing
-            })
+            rep_col, rep_map = "maturity_bucket", bucket_map
+        asset_repricing_sum, liab_repricing_sum = _bucket_sums(
+            pos_key, positions_f, rep_col, tuple(rep_map.items())
+        )
         
-        repricing_df = pd.DataFrame(repricing_data)
+        # 재조정 갭 데이터 (만기 갭과 동일한 벡터 패스)
+        ra_vec = asset_repricing_sum.reindex(bucket_idx, fill_value=0).to_numpy(dtype=float) / 1e9
+        rl_vec = liab_repricing_sum.reindex(bucket_idx, fill_value=0).to_numpy(dtype=float) / 1e9
+        rgap_vec = ra_vec - rl_vec
+        repricing_df = pd.DataFrame({
+            "bucket": bucket_labels,
+            "asset": ra_vec,
+            "liability": rl_vec,
+            "gap": rgap_vec,
+            "cumulative": np.cumsum(rgap_vec),
+        })
         
         fig_rate = go.Figure()
         
@@ -3866,7 +4516,7 @@ def main():
             x=repricing_df["bucket"],
             y=repricing_df["gap"],
             name="Gap",
-            marker_color=["#3b82f6" if g >= 0 else "#3b82f6" for g in repricing_df["gap"]],
+            marker_color="#3b82f6",
             yaxis="y"
         ))
         
@@ -3973,18 +4623,25 @@ def main():
             with cf_result_tabs[0]:
                 st.markdown("#### 📊 일별 집계 Cashflow")
                 
-                # 자산/부채 집계
-                agg_cf = cashflows_df.groupby(['date', 'type']).agg({
-                    'cashflow': 'sum',
-                    'interest': 'sum',
-                    'principal': 'sum'
-                }).reset_index()
-                
-                # Pivot
-                cf_pivot = agg_cf.pivot(index='date', columns='type', values='cashflow').fillna(0)
-                cf_pivot['gap'] = cf_pivot.get('asset', 0) - abs(cf_pivot.get('liability', 0))
-                cf_pivot['cumulative_gap'] = cf_pivot['gap'].cumsum()
-                cf_pivot = cf_pivot.reset_index()
+                # 자산/부채 집계: 날짜 코드 기준 bincount 단일 패스
+                # (groupby+pivot 대체, pivot에 쓰이지 않던 interest/principal 합계는 제거)
+                dates64 = cashflows_df['date'].to_numpy().astype('datetime64[D]')
+                uniq_dates, date_codes = np.unique(dates64, return_inverse=True)
+                n_dates = len(uniq_dates)
+                cf_arr = cashflows_df['cashflow'].to_numpy(dtype=float)
+                types_arr = cashflows_df['type'].to_numpy()
+                sel_a = types_arr == 'asset'
+                sel_l = types_arr == 'liability'
+                asset_sum = np.bincount(date_codes[sel_a], weights=cf_arr[sel_a], minlength=n_dates)
+                liab_sum = np.bincount(date_codes[sel_l], weights=cf_arr[sel_l], minlength=n_dates)
+                gap_arr = asset_sum - np.abs(liab_sum)
+                cf_pivot = pd.DataFrame({
+                    'date': uniq_dates.astype('datetime64[ns]'),
+                    'asset': asset_sum,
+                    'liability': liab_sum,
+                    'gap': gap_arr,
+                    'cumulative_gap': np.cumsum(gap_arr),
+                })
                 
                 # 요약 통계
                 col1, col2, col3, col4 = st.columns(4)
@@ -4007,7 +4664,7 @@ def main():
                 # 데이터 테이블
                 st.markdown("**일별 집계 데이터**")
                 display_cf = cf_pivot.copy()
-                display_cf['date'] = pd.to_datetime(display_cf['date']).dt.strftime('%Y-%m-%d')
+                display_cf['date'] = display_cf['date'].dt.strftime('%Y-%m-%d')
                 if 'asset' in display_cf:
                     display_cf['asset_조'] = (display_cf['asset'] / 1e12).round(2)
                 if 'liability' in display_cf:
@@ -4089,13 +4746,20 @@ def main():
             with cf_result_tabs[2]:
                 st.markdown("#### 🏢 상품별 Cashflow 분석")
                 
-                # 상품별 집계
-                prod_cf = cashflows_df.groupby(['product', 'type']).agg({
-                    'cashflow': 'sum',
-                    'interest': 'sum',
-                    'principal': 'sum',
-                    'balance0': 'sum'
-                }).reset_index()
+                # 상품별 집계: 그룹 코드를 한 번만 만들어 4개 컬럼이 공유 (4회 groupby 대체)
+                prod_codes, prod_uniques = pd.factorize(cashflows_df['product'])
+                type_codes, type_uniques = pd.factorize(cashflows_df['type'])
+                combo = prod_codes * len(type_uniques) + type_codes
+                uniq_combo, combo_inv = np.unique(combo, return_inverse=True)
+                ng = len(uniq_combo)
+                prod_cf = pd.DataFrame({
+                    'product': np.asarray(prod_uniques)[uniq_combo // len(type_uniques)],
+                    'type': np.asarray(type_uniques)[uniq_combo % len(type_uniques)],
+                    **{
+                        c: np.bincount(combo_inv, weights=cashflows_df[c].to_numpy(dtype=float), minlength=ng)
+                        for c in ('cashflow', 'interest', 'principal', 'balance0')
+                    },
+                })
                 
                 # 필터
                 col1, col2 = st.columns(2)
@@ -4159,27 +4823,48 @@ def main():
                 period_map = {"주별": 'W', "월별": 'M', "분기별": 'Q'}
                 freq = period_map[period_type]
                 
-                period_cf = cashflows_df.copy()
-                period_cf['date'] = pd.to_datetime(period_cf['date'])
-                period_cf['period'] = period_cf['date'].dt.to_period(freq)
-                
-                period_agg = period_cf.groupby(['period', 'type']).agg({
-                    'cashflow': 'sum',
-                    'interest': 'sum',
-                    'principal': 'sum'
-                }).reset_index()
-                
-                # Pivot
                 metric_map = {"총 CF": "cashflow", "이자": "interest", "원금": "principal", "GAP": "cashflow"}
                 metric_col = metric_map[metric_type]
-                
-                period_pivot = period_agg.pivot(index='period', columns='type', values=metric_col).fillna(0)
-                
+
+                # Period 객체(행당 파이썬 객체 1개) 대신 정수 버킷 인덱스로 집계
+                dates64 = cashflows_df['date'].to_numpy().astype('datetime64[D]')
+                epoch_days = dates64.astype('int64')
+                if freq == 'W':
+                    # 1970-01-01은 목요일 → +3이면 월요일 시작 주 인덱스
+                    bucket_codes = (epoch_days + 3) // 7
+                elif freq == 'M':
+                    bucket_codes = dates64.astype('datetime64[M]').astype('int64')
+                else:  # 'Q'
+                    bucket_codes = dates64.astype('datetime64[M]').astype('int64') // 3
+
+                uniq_codes, code_inv = np.unique(bucket_codes, return_inverse=True)
+                nb = len(uniq_codes)
+                vals = cashflows_df[metric_col].to_numpy(dtype=float)
+                types_arr = cashflows_df['type'].to_numpy()
+                sel_a = types_arr == 'asset'
+                sel_l = types_arr == 'liability'
+                a_sum = np.bincount(code_inv[sel_a], weights=vals[sel_a], minlength=nb)
+                l_sum = np.bincount(code_inv[sel_l], weights=vals[sel_l], minlength=nb)
+
+                # 라벨은 버킷당 한 번만 생성 (to_period().astype(str)과 동일한 표기)
+                if freq == 'W':
+                    mondays = (uniq_codes * 7 - 3).astype('datetime64[D]')
+                    labels = [
+                        f"{s}/{e}" for s, e in
+                        zip(np.datetime_as_string(mondays), np.datetime_as_string(mondays + 6))
+                    ]
+                elif freq == 'M':
+                    labels = np.datetime_as_string(uniq_codes.astype('datetime64[M]')).tolist()
+                else:
+                    labels = [f"{1970 + c // 4}Q{c % 4 + 1}" for c in uniq_codes]
+
+                period_pivot = pd.DataFrame({
+                    'period_str': labels,
+                    'asset': a_sum,
+                    'liability': l_sum,
+                })
                 if metric_type == "GAP":
-                    period_pivot['value'] = period_pivot.get('asset', 0) - abs(period_pivot.get('liability', 0))
-                    
-                period_pivot = period_pivot.reset_index()
-                period_pivot['period_str'] = period_pivot['period'].astype(str)
+                    period_pivot['value'] = a_sum - np.abs(l_sum)
                 
                 # 차트
                 fig = go.Figure()
@@ -4243,14 +4928,19 @@ def main():
             # 서브탭 5: 데이터 다운로드
             with cf_result_tabs[4]:
                 st.markdown("#### 💾 Cashflow 데이터 다운로드")
-                
+
+                # CF는 _last_run을 만든 (포지션, 기간, 행동 파라미터)의 함수 —
+                # 현재 위젯 값이 아니라 결과와 함께 저장된 키를 사용해야
+                # 수동 재계산 모드에서 이전 결과가 새 키로 캐시되지 않는다
+                cf_key = st.session_state["_last_run_key"]
+
                 col1, col2 = st.columns(2)
-                
+
                 with col1:
                     st.markdown("**상세 CF 데이터**")
                     st.info("모든 계약의 일별 상세 CF 데이터를 다운로드합니다.")
-                    
-                    csv_detail = cashflows_df.to_csv(index=False).encode('utf-8-sig')
+
+                    csv_detail = _csv_bytes((*cf_key, "detail"), cashflows_df)
                     st.download_button(
                         label="📥 상세 CF 다운로드 (CSV)",
                         data=csv_detail,
@@ -4263,7 +4953,7 @@ def main():
                     st.markdown("**집계 CF 데이터**")
                     st.info("일별 집계된 CF 데이터를 다운로드합니다.")
                     
-                    csv_agg = cf_pivot.to_csv(index=False).encode('utf-8-sig')
+                    csv_agg = _csv_bytes((*cf_key, "agg"), cf_pivot)
                     st.download_button(
                         label="📥 집계 CF 다운로드 (CSV)",
                         data=csv_agg,
@@ -4278,17 +4968,8 @@ def main():
                 st.markdown("**📊 Excel 형식 다운로드 (상세 + 집계)**")
                 
                 try:
-                    from io import BytesIO
-                    
-                    output = BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        cashflows_df.to_excel(writer, sheet_name='상세CF', index=False)
-                        cf_pivot.to_excel(writer, sheet_name='집계CF', index=False)
-                        if not prod_cf.empty:
-                            prod_cf.to_excel(writer, sheet_name='상품별CF', index=False)
-                    
-                    excel_data = output.getvalue()
-                    
+                    excel_data = _xlsx_bytes((*cf_key, "xlsx"), cashflows_df, cf_pivot, prod_cf)
+
                     st.download_button(
                         label="📥 전체 데이터 다운로드 (Excel)",
                         data=excel_data,
@@ -4306,7 +4987,9 @@ def main():
         st.markdown("</div>", unsafe_allow_html=True)
 
     # 탭 1: ALM Flow Animation (일자별 시뮬레이션)
-    with sim_tabs[1]:
+    # 애니메이션 본문을 fragment로 격리 — 틱 rerun이 무거운 데이터 탭을 다시 돌리지 않음
+    @st.fragment
+    def _animation_tab():
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("### 🎬 ALM Flow Animation - 일자별 시뮬레이션")
         st.markdown("외곽선 흐름 속도는 만기에 비례하여 길수록 느리게, 짧을수록 빠르게 동작합니다.")
@@ -4356,30 +5039,28 @@ def main():
         # 현재 day
         current_day = st.session_state["anim_day"]
         
-        # 자동 진행
+        # 자동 진행 (이미 끝에 도달했으면 프레임 파이프라인에 들어가기 전에 정지)
         if st.session_state["anim_running"]:
-            current_day = min(current_day + 1, total_days)
-            st.session_state["anim_day"] = current_day
+            if current_day >= total_days:
+                st.session_state["anim_running"] = False
+            else:
+                current_day = min(current_day + 1, total_days)
+                st.session_state["anim_day"] = current_day
         
         # ========================================
         # 🆕 실제 포지션 데이터 기반 일자별 CF 생성
         # ========================================
         from datetime import datetime, timedelta
         
-        # 실제 포지션 데이터로부터 CF 생성
-        raw_cf = build_cashflow_schedule_fast(
-            positions_f,
-            str(start_date.date()),
-            str(end_date.date()),
-            behavioral,
-            rate_shock_bp=0.0,
-            scenario="ANIMATION"
+        # 실제 포지션 데이터로부터 CF 생성 (틱마다 재계산하지 않도록 캐시)
+        raw_cf = _cached_cf(
+            pos_key, positions_f,
+            str(start_date.date()), str(end_date.date()),
+            tuple(sorted(behavioral.items()))
         )
         
         # 일자별로 재샘플링 (기존 CF는 이벤트 기준이므로 일자별로 변환)
         if not raw_cf.empty and "date" in raw_cf.columns:
-            raw_cf["date"] = pd.to_datetime(raw_cf["date"])
-            
             # 전체 기간의 일자 생성
             all_dates = pd.date_range(
                 start=start_date.date(),
@@ -4391,36 +5072,26 @@ def main():
             product_cf_data = raw_cf.copy()
             product_cf_data["day_index"] = (product_cf_data["date"] - pd.Timestamp(start_date.date())).dt.days
             
-            # 일자별 집계 DataFrame 생성
-            daily_agg = pd.DataFrame({"date": all_dates})
-            
-            # type별로 분리하여 집계
-            if len(raw_cf) > 0:
-                # 자산 CF 집계
-                asset_cf_df = raw_cf[raw_cf["type"] == "asset"].groupby(
-                    raw_cf[raw_cf["type"] == "asset"]["date"].dt.date
-                )["cashflow"].sum().reset_index()
-                asset_cf_df.columns = ["date", "asset_cf"]
-                asset_cf_df["date"] = pd.to_datetime(asset_cf_df["date"])
-                
-                # 부채 CF 집계
-                liab_cf_df = raw_cf[raw_cf["type"] == "liability"].groupby(
-                    raw_cf[raw_cf["type"] == "liability"]["date"].dt.date
-                )["cashflow"].sum().reset_index()
-                liab_cf_df.columns = ["date", "liability_cf"]
-                liab_cf_df["date"] = pd.to_datetime(liab_cf_df["date"])
-                
-                # 병합
-                daily_agg = daily_agg.merge(asset_cf_df, on="date", how="left")
-                daily_agg = daily_agg.merge(liab_cf_df, on="date", how="left")
-                daily_agg["asset_cf"] = daily_agg["asset_cf"].fillna(0)
-                daily_agg["liability_cf"] = daily_agg["liability_cf"].fillna(0)
-            else:
-                daily_agg["asset_cf"] = 0
-                daily_agg["liability_cf"] = 0
-            
-            daily_agg["gap_cf"] = daily_agg["asset_cf"] + daily_agg["liability_cf"]  # liability_cf는 이미 음수
-            daily_cf = daily_agg
+            # 일자별 집계: day offset 기준 bincount 한 번으로 자산/부채 동시 집계
+            # (boolean 마스크 2회 + groupby 2회 + merge 2회를 단일 패스로 대체)
+            n_days = len(all_dates)
+            day_idx = (
+                raw_cf["date"].to_numpy().astype("datetime64[D]")
+                - np.datetime64(start_date.date())
+            ).astype(np.int64)
+            cf_vals = raw_cf["cashflow"].to_numpy(dtype=float)
+            types_arr = raw_cf["type"].to_numpy()
+            in_window = (day_idx >= 0) & (day_idx < n_days)
+            sel_a = in_window & (types_arr == "asset")
+            sel_l = in_window & (types_arr == "liability")
+            asset_arr = np.bincount(day_idx[sel_a], weights=cf_vals[sel_a], minlength=n_days)
+            liab_arr = np.bincount(day_idx[sel_l], weights=cf_vals[sel_l], minlength=n_days)
+            daily_cf = pd.DataFrame({
+                "date": all_dates,
+                "asset_cf": asset_arr,
+                "liability_cf": liab_arr,
+                "gap_cf": asset_arr + liab_arr,  # liability_cf는 이미 음수
+            })
         else:
             # fallback: 빈 데이터프레임
             all_dates = pd.date_range(
@@ -4440,22 +5111,13 @@ def main():
         cf_to_date = daily_cf.iloc[:current_day+1] if current_day < len(daily_cf) else daily_cf
         cum_gap = float(cf_to_date["gap_cf"].sum())
         
-        # HQLA 계산
-        hqla_balance = float(positions_f[positions_f["type"] == "hqla"]["balance"].sum())
-        
-        # 초기 현금 (HQLA 중 현금)
-        cash_rows = positions_f[positions_f["type"] == "hqla"]
-        cash0 = float(cash_rows[cash_rows["product"].str.contains("현금", na=False)]["balance"].sum())
-        
+        # HQLA 계산 (현금/기타 분해는 포지션 해시 기준으로 캐시)
+        cash0, hqla_other_balance = _hqla_cash_split(pos_key, positions_f)
+        hqla_balance = cash0 + hqla_other_balance
+
         # 현재 시점 현금 = 초기 현금 + 누적 GAP
         cash_t = cash0 + cum_gap
         
-        # HQLA 기타 (현금 제외)
-        hqla_other = positions_f[positions_f["type"] == "hqla"].copy()
-        if not hqla_other.empty:
-            hqla_other = hqla_other[~(hqla_other["product"].str.contains("현금", na=False))].reset_index(drop=True)
-        hqla_other_balance = float(hqla_other["balance"].sum()) if not hqla_other.empty else 0.0
-        
         # ==========================================
         # 🆕 실제 Cash 증감을 반영한 LCR 계산
         # ==========================================
@@ -4469,43 +5131,19 @@ def main():
         # (현금이 마이너스면 HQLA에서 차감)
         current_hqla = hqla_other_balance + cash_t
         
-        # 4. LCR_FORE 시트에서 기초자료 로드
-        lcr_fore_df = load_lcr_forecast_from_excel()
-        
-        # LCR_FORE 데이터를 딕셔너리로 변환 (빠른 조회용)
-        lcr_fore_dict = {}
-        if not lcr_fore_df.empty:
-            for idx, row in lcr_fore_df.iterrows():
-                day_str = str(row["일자"])
-                lcr_fore_dict[day_str] = {
-                    "lcr": row.get("LCR(%)", 100.0),
-                    "hqla": row.get("고유동성자산(A)", 20.0),
-                    "outflow": row.get("유출금액(B)", row.get("현금유출(B)", 120.0)),
-                    "inflow": row.get("유입금액(C)", row.get("현금유입(C)", 100.0)),
-                }
+        # 4. LCR_FORE 기초자료 조회용 딕셔너리 (mtime 기준 캐시 — 틱마다 파싱 안 함)
+        lcr_fore_dict = _lcr_fore_lookup(DEFAULT_EXCEL_PATH, excel_mtime)
         
-        # 현재 day에 해당하는 LCR_FORE 데이터 조회
-        day_key = f"D+{current_day}"
-        if day_key in lcr_fore_dict:
-            lcr_fore_data = lcr_fore_dict[day_key]
-            base_hqla_fore = lcr_fore_data["hqla"]  # LCR_FORE 시트의 해당일 고유동성자산
-            lcr_outflow = lcr_fore_data["outflow"]
-            lcr_inflow = lcr_fore_data["inflow"]
-            original_lcr = lcr_fore_data["lcr"]  # LCR_FORE 시트의 미리 산출된 LCR
-        else:
-            # fallback: 마지막 데이터 사용
-            last_key = f"D+{min(current_day, 60)}"
-            if last_key in lcr_fore_dict:
-                lcr_fore_data = lcr_fore_dict[last_key]
-                base_hqla_fore = lcr_fore_data["hqla"]
-                lcr_outflow = lcr_fore_data["outflow"]
-                lcr_inflow = lcr_fore_data["inflow"]
-                original_lcr = lcr_fore_data["lcr"]
-            else:
-                base_hqla_fore = 20.0
-                lcr_outflow = 120.0
-                lcr_inflow = 100.0
-                original_lcr = 100.0
+        # 현재 day에 해당하는 LCR_FORE 데이터 조회 (없으면 마지막 데이터 → 기본값)
+        lcr_fore_data = (
+            lcr_fore_dict.get(f"D+{current_day}")
+            or lcr_fore_dict.get(f"D+{min(current_day, 60)}")
+            or {"lcr": 100.0, "hqla": 20.0, "outflow": 120.0, "inflow": 100.0}
+        )
+        base_hqla_fore = lcr_fore_data["hqla"]  # LCR_FORE 시트의 해당일 고유동성자산
+        lcr_outflow = lcr_fore_data["outflow"]
+        lcr_inflow = lcr_fore_data["inflow"]
+        original_lcr = lcr_fore_data["lcr"]  # LCR_FORE 시트의 미리 산출된 LCR
         
         lcr_net_outflow = lcr_outflow - lcr_inflow
         
@@ -4529,54 +5167,26 @@ def main():
         # ==========================================
         # 🆕 실시간 KPI 대시보드 (화면 상단)
         # ==========================================
-        # LCR 변동에 따른 색상 결정
-        lcr_color = "#10b981" if lcr >= 100 else "#ef4444"  # 100% 이상: 녹색, 미만: 빨강
-        delta_color = "#10b981" if lcr_delta >= 0 else "#ef4444"  # 증가: 녹색, 감소: 빨강
-        delta_sign = "+" if lcr_delta >= 0 else ""
-        
-        st.markdown("""
-        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                    padding: 20px; border-radius: 16px; margin-bottom: 20px; color: white;">
-            <div style="display: grid; grid-template-columns: repeat(5, 1fr); gap: 15px;">
-                <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
-                    <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">📊 NII (누적)</div>
-                    <div style="font-size: 24px; font-weight: 800;">{:.2f}조</div>
-                </div>
-                <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
-                    <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">💧 LCR (조정)</div>
-                    <div style="font-size: 24px; font-weight: 800; color: {lcr_color};">{lcr:.1f}%</div>
-                    <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">원본: {original:.1f}% | <span style="color:{delta_color}">{delta_sign}{delta:.1f}%p</span></div>
-                </div>
-                <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
-                    <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">🏦 HQLA (조정)</div>
-                    <div style="font-size: 24px; font-weight: 800;">{adj_hqla:.2f}조</div>
-                    <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">기준: {base_hqla:.2f}조</div>
-                </div>
-                <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
-                    <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">💰 CF 누적 GAP</div>
-                    <div style="font-size: 24px; font-weight: 800;">{gap:.2f}조</div>
-                </div>
-                <div style="background: rgba(255,255,255,0.15); padding: 15px; border-radius: 12px; backdrop-filter: blur(10px);">
-                    <div style="font-size: 13px; opacity: 0.9; margin-bottom: 5px;">📈 순유출</div>
-                    <div style="font-size: 24px; font-weight: 800;">{net_out:.2f}조</div>
-                    <div style="font-size: 11px; opacity: 0.8; margin-top: 3px;">유출:{out:.1f} - 유입:{inflow:.1f}</div>
-                </div>
-            </div>
-        </div>
-        """.format(nii_ytd/1e12, 
-                   lcr_color=lcr_color, lcr=lcr, original=original_lcr, delta_color=delta_color, delta_sign=delta_sign, delta=lcr_delta,
-                   adj_hqla=adjusted_hqla_fore, base_hqla=base_hqla_fore,
-                   gap=cum_gap_trillion,
-                   net_out=lcr_net_outflow, out=lcr_outflow, inflow=lcr_inflow), unsafe_allow_html=True)
-        
-        # SVG 애니메이션 생성
-        svg_anim = build_svg_animation(
-            positions_f, 
-            daily_cf, 
-            current_day, 
-            total_days, 
+        st.markdown(
+            _anim_kpi_html(
+                round(nii_ytd / 1e12, 2), round(lcr, 1), round(original_lcr, 1),
+                round(lcr_delta, 1), round(adjusted_hqla_fore, 2), round(base_hqla_fore, 2),
+                round(cum_gap_trillion, 2), round(lcr_net_outflow, 2),
+                round(lcr_outflow, 1), round(lcr_inflow, 1),
+            ),
+            unsafe_allow_html=True,
+        )
+        
+        # SVG 애니메이션 생성 (같은 프레임 재방문 시 캐시 재사용)
+        svg_anim = _svg_frame(
+            pos_key,
+            (str(start_date.date()), str(end_date.date()), tuple(sorted(behavioral.items()))),
+            positions_f,
+            daily_cf,
+            current_day,
+            total_days,
             st.session_state["base_seconds_per_cycle"],
-            product_cf_data  # 🆕 상품별 CF 데이터 전달
+            product_cf_data,  # 🆕 상품별 CF 데이터 전달
         )
         
         # 진행 상태 표시
@@ -4599,9 +5209,12 @@ def main():
                 st.session_state["anim_running"] = False
             else:
                 time.sleep(1.0 / max(1, anim_fps))
-                st.rerun()
+                st.rerun(scope="fragment")
         
         st.markdown("</div>", unsafe_allow_html=True)
+
+    with sim_tabs[1]:
+        _animation_tab()
     
     # 탭 3: 데이터 분석
     with sim_tabs[2]:
@@ -4610,10 +5223,21 @@ def main():
         
         # 서브탭
         data_subtabs = st.tabs(["자산 상품", "부채 상품", "HQLA", "전체 요약"])
-        
+
+        # 유형별 분리는 마스크 한 번으로 끝내고 모든 서브탭에서 재사용
+        _types_np = positions_f["type"].to_numpy()
+        assets_df = positions_f.loc[_types_np == "asset"]
+        liabs_df = positions_f.loc[_types_np == "liability"]
+        hqla_df = positions_f.loc[_types_np == "hqla"]
+
+        # 유형별 잔액 합계도 한 번만 구해 모든 서브탭 metric에서 재사용
+        _type_sums = positions_f.groupby("type", observed=True)["balance"].sum()
+        total_assets = float(_type_sums.get("asset", 0.0))
+        total_liabs = float(_type_sums.get("liability", 0.0))
+        total_hqla = float(_type_sums.get("hqla", 0.0))
+
         with data_subtabs[0]:
             st.markdown("#### 💰 자산 상품 분석")
-            assets_df = positions_f[positions_f["type"] == "asset"].copy()
             
             if not assets_df.empty:
                 # 요약 통계
@@ -4621,7 +5245,7 @@ def main():
                 with col1:
                     st.metric("자산 상품 수", len(assets_df))
                 with col2:
-                    st.metric("총 잔액", f"{assets_df['balance'].sum()/1e9:,.1f} 조")
+                    st.metric("총 잔액", f"{total_assets/1e9:,.1f} 조")
                 with col3:
                     avg_duration = assets_df['duration'].mean()
                     st.metric("평균 듀레이션", f"{avg_duration:.2f} 년")
@@ -4632,55 +5256,31 @@ def main():
                 
                 # 상세 데이터
                 st.markdown("**상세 데이터**")
-                display_cols = ['product', 'maturity_bucket', 'balance', 'duration']
+                # 포맷된 컬럼 dict로 프레임을 한 번에 생성 (copy + 재대입 없음)
+                display_data = {
+                    'product': assets_df['product'].to_numpy(),
+                    'maturity_bucket': assets_df['maturity_bucket'].to_numpy(),
+                    'balance': _fmt_trillion(assets_df['balance'].to_numpy()),
+                    'duration': assets_df['duration'].to_numpy(),
+                }
                 if 'rate' in assets_df.columns:
-                    display_cols.append('rate')
+                    display_data['rate'] = _fmt_pct(assets_df['rate'].to_numpy())
                 if 'spread' in assets_df.columns:
-                    display_cols.append('spread')
-                
-                display_df = assets_df[display_cols].copy()
-                display_df['balance'] = display_df['balance'].apply(lambda x: f"{x/1e9:,.2f} 조")
-                if 'rate' in display_df.columns:
-                    display_df['rate'] = display_df['rate'].apply(lambda x: f"{x*100:.2f}%")
-                if 'spread' in display_df.columns:
-                    display_df['spread'] = display_df['spread'].apply(lambda x: f"{x*100:.2f}%")
+                    display_data['spread'] = _fmt_pct(assets_df['spread'].to_numpy())
+                display_df = pd.DataFrame(display_data)
                 
                 st.dataframe(display_df, use_container_width=True)
                 
-                # 시각화
-                col1, col2 = st.columns(2)
-                with col1:
-                    # 만기별 잔액 분포
-                    bucket_summary = assets_df.groupby('maturity_bucket')['balance'].sum().reset_index()
-                    fig = go.Figure(data=[
-                        go.Bar(x=bucket_summary['maturity_bucket'], 
-                               y=bucket_summary['balance']/1e9,
-                               marker_color='#7fb6ff')
-                    ])
-                    fig.update_layout(
-                        title="자산 만기별 잔액 분포",
-                        xaxis_title="만기 버킷",
-                        yaxis_title="잔액 (조)",
-                        height=300
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    # 상품별 비중
-                    product_summary = assets_df.groupby('product')['balance'].sum()
-                    fig = go.Figure(data=[
-                        go.Pie(labels=product_summary.index, 
-                               values=product_summary.values,
-                               hole=0.4)
-                    ])
-                    fig.update_layout(title="자산 상품별 비중", height=300)
-                    st.plotly_chart(fig, use_container_width=True)
+                # 시각화 (포지션이 같으면 캐시된 Figure 재사용)
+                st.plotly_chart(
+                    _type_detail_figs(pos_key, assets_df, '#7fb6ff', '자산'),
+                    use_container_width=True,
+                )
             else:
                 st.info("자산 데이터가 없습니다.")
         
         with data_subtabs[1]:
             st.markdown("#### 💳 부채 상품 분석")
-            liabs_df = positions_f[positions_f["type"] == "liability"].copy()
             
             if not liabs_df.empty:
                 # 요약 통계
@@ -4688,7 +5288,7 @@ def main():
                 with col1:
                     st.metric("부채 상품 수", len(liabs_df))
                 with col2:
-                    st.metric("총 잔액", f"{liabs_df['balance'].sum()/1e9:,.1f} 조")
+                    st.metric("총 잔액", f"{total_liabs/1e9:,.1f} 조")
                 with col3:
                     avg_duration = liabs_df['duration'].mean()
                     st.metric("평균 듀레이션", f"{avg_duration:.2f} 년")
@@ -4699,55 +5299,31 @@ def main():
                 
                 # 상세 데이터
                 st.markdown("**상세 데이터**")
-                display_cols = ['product', 'maturity_bucket', 'balance', 'duration']
+                # 포맷된 컬럼 dict로 프레임을 한 번에 생성 (copy + 재대입 없음)
+                display_data = {
+                    'product': liabs_df['product'].to_numpy(),
+                    'maturity_bucket': liabs_df['maturity_bucket'].to_numpy(),
+                    'balance': _fmt_trillion(liabs_df['balance'].to_numpy()),
+                    'duration': liabs_df['duration'].to_numpy(),
+                }
                 if 'rate' in liabs_df.columns:
-                    display_cols.append('rate')
+                    display_data['rate'] = _fmt_pct(liabs_df['rate'].to_numpy())
                 if 'spread' in liabs_df.columns:
-                    display_cols.append('spread')
-                
-                display_df = liabs_df[display_cols].copy()
-                display_df['balance'] = display_df['balance'].apply(lambda x: f"{x/1e9:,.2f} 조")
-                if 'rate' in display_df.columns:
-                    display_df['rate'] = display_df['rate'].apply(lambda x: f"{x*100:.2f}%")
-                if 'spread' in display_df.columns:
-                    display_df['spread'] = display_df['spread'].apply(lambda x: f"{x*100:.2f}%")
+                    display_data['spread'] = _fmt_pct(liabs_df['spread'].to_numpy())
+                display_df = pd.DataFrame(display_data)
                 
                 st.dataframe(display_df, use_container_width=True)
                 
-                # 시각화
-                col1, col2 = st.columns(2)
-                with col1:
-                    # 만기별 잔액 분포
-                    bucket_summary = liabs_df.groupby('maturity_bucket')['balance'].sum().reset_index()
-                    fig = go.Figure(data=[
-                        go.Bar(x=bucket_summary['maturity_bucket'], 
-                               y=bucket_summary['balance']/1e9,
-                               marker_color='#c9ced6')
-                    ])
-                    fig.update_layout(
-                        title="부채 만기별 잔액 분포",
-                        xaxis_title="만기 버킷",
-                        yaxis_title="잔액 (조)",
-                        height=300
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    # 상품별 비중
-                    product_summary = liabs_df.groupby('product')['balance'].sum()
-                    fig = go.Figure(data=[
-                        go.Pie(labels=product_summary.index, 
-                               values=product_summary.values,
-                               hole=0.4)
-                    ])
-                    fig.update_layout(title="부채 상품별 비중", height=300)
-                    st.plotly_chart(fig, use_container_width=True)
+                # 시각화 (포지션이 같으면 캐시된 Figure 재사용)
+                st.plotly_chart(
+                    _type_detail_figs(pos_key, liabs_df, '#c9ced6', '부채'),
+                    use_container_width=True,
+                )
             else:
                 st.info("부채 데이터가 없습니다.")
         
         with data_subtabs[2]:
             st.markdown("#### 🏦 HQLA (고유동성자산) 분석")
-            hqla_df = positions_f[positions_f["type"] == "hqla"].copy()
             
             if not hqla_df.empty:
                 # 요약 통계
@@ -4755,42 +5331,30 @@ def main():
                 with col1:
                     st.metric("HQLA 항목 수", len(hqla_df))
                 with col2:
-                    st.metric("총 HQLA", f"{hqla_df['balance'].sum()/1e9:,.1f} 조")
+                    st.metric("총 HQLA", f"{total_hqla/1e9:,.1f} 조")
                 with col3:
                     lcr_ratio = base_k.get("LCR", 0)
                     st.metric("LCR 비율", f"{lcr_ratio:.2f}")
                 
                 # 상세 데이터
                 st.markdown("**상세 데이터**")
-                display_df = hqla_df[['product', 'balance']].copy()
-                display_df['balance'] = display_df['balance'].apply(lambda x: f"{x/1e9:,.2f} 조")
-                display_df['비중(%)'] = (hqla_df['balance'] / hqla_df['balance'].sum() * 100).apply(lambda x: f"{x:.1f}%")
+                display_df = pd.DataFrame({
+                    'product': hqla_df['product'].to_numpy(),
+                    'balance': _fmt_trillion(hqla_df['balance'].to_numpy()),
+                    '비중(%)': _fmt_pct((hqla_df['balance'] / total_hqla).to_numpy(), digits=1),
+                })
                 
                 st.dataframe(display_df, use_container_width=True)
                 
-                # 시각화
-                fig = go.Figure(data=[
-                    go.Bar(x=hqla_df['product'], 
-                           y=hqla_df['balance']/1e9,
-                           marker_color='#19c37d')
-                ])
-                fig.update_layout(
-                    title="HQLA 항목별 잔액",
-                    xaxis_title="항목",
-                    yaxis_title="잔액 (조)",
-                    height=350
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                # 시각화 (포지션이 같으면 캐시된 Figure 재사용)
+                st.plotly_chart(_hqla_fig(pos_key, hqla_df), use_container_width=True)
             else:
                 st.info("HQLA 데이터가 없습니다.")
         
         with data_subtabs[3]:
             st.markdown("#### 📈 전체 포트폴리오 요약")
             
-            # 전체 통계
-            total_assets = float(positions_f[positions_f["type"] == "asset"]["balance"].sum())
-            total_liabs = float(positions_f[positions_f["type"] == "liability"]["balance"].sum())
-            total_hqla = float(positions_f[positions_f["type"] == "hqla"]["balance"].sum())
+            # 전체 통계 (합계는 탭 상단에서 계산됨)
             net_position = total_assets - total_liabs
             
             col1, col2, col3, col4, col5 = st.columns(5)
@@ -4809,44 +5373,17 @@ def main():
             # 만기 구조 비교
             st.markdown("**자산-부채 만기 구조 비교**")
             
-            assets_by_bucket = positions_f[positions_f["type"] == "asset"].groupby('maturity_bucket')['balance'].sum()
-            liabs_by_bucket = positions_f[positions_f["type"] == "liability"].groupby('maturity_bucket')['balance'].sum()
-            
-            all_buckets = sorted(set(list(assets_by_bucket.index) + list(liabs_by_bucket.index)), 
-                                key=lambda x: BUCKET_ORDER.index(x) if x in BUCKET_ORDER else 999)
-            
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                name='자산',
-                x=all_buckets,
-                y=[assets_by_bucket.get(b, 0)/1e9 for b in all_buckets],
-                marker_color='#7fb6ff'
-            ))
-            fig.add_trace(go.Bar(
-                name='부채',
-                x=all_buckets,
-                y=[liabs_by_bucket.get(b, 0)/1e9 for b in all_buckets],
-                marker_color='#c9ced6'
-            ))
-            fig.update_layout(
-                title="만기 버킷별 자산-부채 비교",
-                xaxis_title="만기 버킷",
-                yaxis_title="잔액 (조)",
-                barmode='group',
-                height=400
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(_maturity_compare_fig(pos_key, positions_f), use_container_width=True)
             
             # 듀레이션 GAP 분석
             st.markdown("**듀레이션 GAP 분석**")
             
-            assets_dur = positions_f[positions_f["type"] == "asset"]
-            liabs_dur = positions_f[positions_f["type"] == "liability"]
-            
-            if not assets_dur.empty and not liabs_dur.empty:
-                # 가중평균 듀레이션
-                asset_weighted_dur = (assets_dur['duration'] * assets_dur['balance']).sum() / assets_dur['balance'].sum()
-                liab_weighted_dur = (liabs_dur['duration'] * liabs_dur['balance']).sum() / liabs_dur['balance'].sum()
+            if not assets_df.empty and not liabs_df.empty:
+                # 가중평균 듀레이션 (중간 Series 없이 dot 한 번씩)
+                a_bal = assets_df['balance'].to_numpy(dtype=np.float64)
+                l_bal = liabs_df['balance'].to_numpy(dtype=np.float64)
+                asset_weighted_dur = np.dot(assets_df['duration'].to_numpy(dtype=np.float64), a_bal) / a_bal.sum()
+                liab_weighted_dur = np.dot(liabs_df['duration'].to_numpy(dtype=np.float64), l_bal) / l_bal.sum()
                 duration_gap = asset_weighted_dur - liab_weighted_dur
                 
                 col1, col2, col3 = st.columns(3)
@@ -4861,8 +5398,8 @@ def main():
             # 데이터 다운로드
             st.markdown("**데이터 다운로드**")
             
-            # CSV 생성
-            csv = positions_f.to_csv(index=False).encode('utf-8-sig')
+            # CSV 생성 (포지션이 같으면 직렬화 결과 재사용)
+            csv = _csv_bytes((pos_key, "positions"), positions_f)
             st.download_button(
                 label="📥 전체 데이터 CSV 다운로드",
                 data=csv,
@@ -4999,38 +5536,31 @@ def main():
                 
                 # CF 데이터에서 LCR 데이터 생성
                 if not cashflows_df.empty:
-                    agg_cf_lcr = cashflows_df.groupby(['date', 'type']).agg({'cashflow': 'sum'}).reset_index()
-                    cf_pivot_lcr = agg_cf_lcr.pivot(index='date', columns='type', values='cashflow').fillna(0).reset_index()
-                    
-                    # D+0 초기값 추가
-                    lcr_data_list = [{
-                        "일자": "D+0",
-                        "고유동성자산(A)": round(initial_hqla_cf, 2),
-                        "현금유출(B)": round(initial_outflow_cf, 2),
-                        "현금유입(C)": round(initial_inflow_cf, 2)
-                    }]
-                    
-                    cumulative_hqla = initial_hqla_cf
+                    cf_pivot_lcr = cashflows_df.pivot_table(
+                        index='date', columns='type', values='cashflow',
+                        aggfunc='sum', fill_value=0, observed=True,
+                    ).reset_index()
                     
-                    for idx, row in cf_pivot_lcr.iterrows():
-                        day_num = idx + 1
-                        if day_num > 60:
-                            break
-                        
-                        asset_cf = row.get('asset', 0) / 1e12  # 조 단위
-                        liab_cf = abs(row.get('liability', 0)) / 1e12
-                        
+                    # D+1..D+60 구간을 누적 배열로 한 번에 구성 (iterrows 대체)
+                    # cumsum/브로드캐스트 기반이라 지평이 수천 일로 늘어도 O(n) 유지
+                    n_lcr = min(len(cf_pivot_lcr), 60)
+                    zeros = np.zeros(n_lcr)
+                    asset_cf = (cf_pivot_lcr['asset'].to_numpy(dtype=float)[:n_lcr] / 1e12
+                                if 'asset' in cf_pivot_lcr.columns else zeros)  # 조 단위
+                    liab_cf = (np.abs(cf_pivot_lcr['liability'].to_numpy(dtype=float)[:n_lcr]) / 1e12
+                               if 'liability' in cf_pivot_lcr.columns else zeros)
+                    day_nums = np.arange(1, n_lcr + 1)
+                    lcr_input_df = pd.DataFrame({
+                        "일자": ["D+0"] + [f"D+{d}" for d in day_nums],
                         # HQLA는 자산CF 유입으로 증가
-                        cumulative_hqla += asset_cf
-                        
-                        lcr_data_list.append({
-                            "일자": f"D+{day_num}",
-                            "고유동성자산(A)": round(cumulative_hqla, 2),
-                            "현금유출(B)": round(initial_outflow_cf + liab_cf * day_num, 2),  # 누적 유출
-                            "현금유입(C)": round(initial_inflow_cf + asset_cf * day_num, 2)  # 누적 유입
-                        })
-                    
-                    lcr_input_df = pd.DataFrame(lcr_data_list)
+                        "고유동성자산(A)": np.round(
+                            np.concatenate(([initial_hqla_cf], initial_hqla_cf + np.cumsum(asset_cf))), 2),
+                        # 누적 유출 / 누적 유입
+                        "현금유출(B)": np.round(
+                            np.concatenate(([initial_outflow_cf], initial_outflow_cf + liab_cf * day_nums)), 2),
+                        "현금유입(C)": np.round(
+                            np.concatenate(([initial_inflow_cf], initial_inflow_cf + asset_cf * day_nums)), 2),
+                    })
                     st.dataframe(lcr_input_df, use_container_width=True, height=300)
                 else:
                     st.warning("⚠️ CF 시뮬레이션 데이터가 없습니다. 먼저 CF 결과 분석 탭에서 데이터를 확인하세요.")
@@ -5040,15 +5570,22 @@ def main():
             
             # LCR 계산 및 시각화
             if 'lcr_input_df' in dir() and not lcr_input_df.empty:
+                # 일자 라벨은 Arrow 문자열로 보관 — 연속 UTF-8 저장으로 메모리를 줄이고
+                # .str 연산·st.dataframe 직렬화가 Arrow C++ 커널로 처리됨
+                # (pyarrow는 streamlit의 필수 의존성이라 항상 사용 가능)
+                if "일자" in lcr_input_df.columns:
+                    lcr_input_df["일자"] = lcr_input_df["일자"].astype("string[pyarrow]")
                 # 순유출 계산
                 lcr_input_df["순유출(B-C)"] = lcr_input_df["현금유출(B)"] - lcr_input_df["현금유입(C)"]
                 
                 # LCR(%) 계산 (입력된 원본 값 사용하거나 신규 계산)
                 if "원본LCR(%)" not in lcr_input_df.columns:
-                    lcr_input_df["LCR(%)"] = lcr_input_df.apply(
-                        lambda row: round((row["고유동성자산(A)"] / row["순유출(B-C)"]) * 100, 2) 
-                        if row["순유출(B-C)"] > 0 else 999.99, 
-                        axis=1
+                    hqla_a = lcr_input_df["고유동성자산(A)"].to_numpy(dtype=float)
+                    net_bc = lcr_input_df["순유출(B-C)"].to_numpy(dtype=float)
+                    lcr_input_df["LCR(%)"] = np.where(
+                        net_bc > 0,
+                        np.round(hqla_a / np.where(net_bc > 0, net_bc, 1.0) * 100, 2),
+                        999.99,
                     )
                 
                 # =============================================================
@@ -5078,91 +5615,89 @@ def main():
                 if apply_cf_impact and not cashflows_df.empty:
                     st.markdown("##### 📈 시뮬레이션 영향 분석")
                     
-                    # CF GAP 누적 계산
-                    agg_cf_gap = cashflows_df.groupby(['date', 'type']).agg({'cashflow': 'sum'}).reset_index()
-                    cf_pivot_gap = agg_cf_gap.pivot(index='date', columns='type', values='cashflow').fillna(0)
-                    
+                    # CF GAP 누적 계산 — groupby+unstack 후 2컬럼 연속 배열로 한 번에 추출
                     # asset 유입 = HQLA 증가, liability 유출 = HQLA 감소 (순유출 증가)
-                    asset_cf_daily = cf_pivot_gap.get('asset', pd.Series([0]*len(cf_pivot_gap))).values / 1e12
-                    liab_cf_daily = cf_pivot_gap.get('liability', pd.Series([0]*len(cf_pivot_gap))).values / 1e12
-                    
-                    # 일자 매핑 함수 (D+0, D+1, D+2, ... -> index)
-                    def parse_day_index(day_str):
-                        try:
-                            return int(day_str.replace("D+", ""))
-                        except:
-                            return 0
-                    
-                    adjusted_hqla_list = []
-                    adjusted_outflow_list = []
-                    adjusted_inflow_list = []
-                    adjusted_lcr_list = []
-                    delta_lcr_list = []
-                    
-                    cumulative_asset_cf = 0.0
-                    cumulative_liab_cf = 0.0
-                    
-                    for idx in range(len(lcr_input_df)):
-                        day_idx = parse_day_index(str(lcr_input_df["일자"].iloc[idx]))
-                        
-                        # 해당 일자까지의 누적 CF 계산
-                        if day_idx > 0 and day_idx <= len(asset_cf_daily):
-                            cumulative_asset_cf = sum(asset_cf_daily[:day_idx])
-                            cumulative_liab_cf = sum(liab_cf_daily[:day_idx])
-                        
-                        # 조정된 HQLA, 유출, 유입 계산
-                        base_hqla = lcr_input_df["고유동성자산(A)"].iloc[idx]
-                        base_outflow = lcr_input_df["현금유출(B)"].iloc[idx]
-                        base_inflow = lcr_input_df["현금유입(C)"].iloc[idx]
-                        
-                        # HQLA: 자산 CF 유입으로 증가, 부채 CF 유출로 감소
-                        adjusted_hqla = base_hqla + cumulative_asset_cf + cumulative_liab_cf
-                        
-                        # 유출/유입은 원본 유지 (또는 CF 영향 반영)
-                        adjusted_outflow = base_outflow
-                        adjusted_inflow = base_inflow
-                        
-                        # 조정된 LCR 계산
-                        net_outflow = adjusted_outflow - adjusted_inflow
-                        adjusted_lcr = (adjusted_hqla / net_outflow) * 100 if net_outflow > 0 else 999.99
-                        
-                        # 원본 대비 변동
-                        if use_original_lcr and "원본LCR(%)" in lcr_input_df.columns:
-                            original_lcr = lcr_input_df["원본LCR(%)"].iloc[idx]
-                            delta = adjusted_lcr - original_lcr
-                        else:
-                            original_lcr = lcr_input_df["LCR(%)"].iloc[idx]
-                            delta = adjusted_lcr - original_lcr
-                        
-                        adjusted_hqla_list.append(round(adjusted_hqla, 2))
-                        adjusted_outflow_list.append(round(adjusted_outflow, 2))
-                        adjusted_inflow_list.append(round(adjusted_inflow, 2))
-                        adjusted_lcr_list.append(round(adjusted_lcr, 2))
-                        delta_lcr_list.append(round(delta, 2))
+                    cf_gap_mat = (
+                        cashflows_df.groupby(['date', 'type'], observed=True, sort=False)['cashflow']
+                        .sum().unstack('type', fill_value=0)
+                        .sort_index()
+                        .reindex(columns=['asset', 'liability'], fill_value=0)
+                        .to_numpy(dtype=float) / 1e12
+                    )
+                    asset_cf_daily = cf_gap_mat[:, 0]
+                    liab_cf_daily = cf_gap_mat[:, 1]
                     
-                    lcr_input_df["조정HQLA"] = adjusted_hqla_list
-                    lcr_input_df["조정유출"] = adjusted_outflow_list
-                    lcr_input_df["조정유입"] = adjusted_inflow_list
-                    lcr_input_df["조정LCR(%)"] = adjusted_lcr_list
-                    lcr_input_df["LCR변동(%)"] = delta_lcr_list
+                    # 일자 인덱스/누적 CF를 배열로 한 번에 계산 (O(N²) 슬라이스 합 제거)
+                    # 기존 parse_day_index의 예외→0 폴백을 C 레벨 한 패스로 유지
+                    day_idx_arr = (
+                        lcr_input_df["일자"].astype(str)
+                        .str.extract(r"(-?\d+)", expand=False)
+                        .fillna("0").astype(np.int32).to_numpy()
+                    )
+                    n_cf = len(asset_cf_daily)
+                    asset_cum = np.concatenate(([0.0], np.cumsum(asset_cf_daily)))
+                    liab_cum = np.concatenate(([0.0], np.cumsum(liab_cf_daily)))
+                    pos = np.clip(day_idx_arr, 0, n_cf)
+                    cumulative_asset_cf = asset_cum[pos]
+                    cumulative_liab_cf = liab_cum[pos]
+
+                    base_hqla = lcr_input_df["고유동성자산(A)"].to_numpy(dtype=float)
+                    base_outflow = lcr_input_df["현금유출(B)"].to_numpy(dtype=float)
+                    base_inflow = lcr_input_df["현금유입(C)"].to_numpy(dtype=float)
+
+                    # HQLA: 자산 CF 유입으로 증가, 부채 CF 유출로 감소
+                    # (유출/유입은 원본 유지)
+                    adjusted_hqla = base_hqla + cumulative_asset_cf + cumulative_liab_cf
+                    net_outflow = base_outflow - base_inflow
+
+                    # 원본 대비 변동
+                    lcr_base_col = ("원본LCR(%)"
+                                    if use_original_lcr and "원본LCR(%)" in lcr_input_df.columns
+                                    else "LCR(%)")
+                    original_lcr = lcr_input_df[lcr_base_col].to_numpy(dtype=float)
+
+                    try:
+                        # numexpr가 있으면 조건식을 한 번의 fused 패스로 계산
+                        # (중간 배열 할당 없이 멀티스레드 커널 사용, 장기 예측에서 유리)
+                        import numexpr as ne
+                        adjusted_lcr = ne.evaluate(
+                            "where(net_outflow > 0, adjusted_hqla / where(net_outflow > 0, net_outflow, 1.0) * 100, 999.99)"
+                        )
+                        delta_lcr = ne.evaluate("adjusted_lcr - original_lcr")
+                    except ImportError:
+                        adjusted_lcr = np.where(
+                            net_outflow > 0,
+                            adjusted_hqla / np.where(net_outflow > 0, net_outflow, 1.0) * 100,
+                            999.99,
+                        )
+                        delta_lcr = adjusted_lcr - original_lcr
+
+                    lcr_input_df["조정HQLA"] = np.round(adjusted_hqla, 2)
+                    lcr_input_df["조정유출"] = np.round(base_outflow, 2)
+                    lcr_input_df["조정유입"] = np.round(base_inflow, 2)
+                    lcr_input_df["조정LCR(%)"] = np.round(adjusted_lcr, 2)
+                    lcr_input_df["LCR변동(%)"] = np.round(delta_lcr, 2)
                     
                     # 시뮬레이션 영향 요약
                     st.markdown("**📊 시뮬레이션 영향 요약:**")
                     
                     impact_col1, impact_col2, impact_col3 = st.columns(3)
-                    
+
+                    # 집계는 C 커널(ndarray.sum/np.mean)로 한 번에 계산
+                    # (파이썬 sum()의 원소별 반복 제거)
+                    total_asset_cf = float(asset_cf_daily.sum()) if asset_cf_daily.size else 0.0
+                    total_liab_cf = float(liab_cf_daily.sum()) if liab_cf_daily.size else 0.0
+                    avg_delta = float(np.mean(delta_lcr)) if delta_lcr.size else 0.0
+
                     with impact_col1:
-                        total_asset_cf = sum(asset_cf_daily) if len(asset_cf_daily) > 0 else 0
-                        st.metric("총 자산CF 유입", f"{total_asset_cf:.2f}조", 
+                        st.metric("총 자산CF 유입", f"{total_asset_cf:.2f}조",
                                  delta="HQLA 증가" if total_asset_cf > 0 else "HQLA 감소")
-                    
+
                     with impact_col2:
-                        total_liab_cf = sum(liab_cf_daily) if len(liab_cf_daily) > 0 else 0
                         st.metric("총 부채CF 유출", f"{total_liab_cf:.2f}조",
                                  delta="HQLA 감소" if total_liab_cf < 0 else "HQLA 증가")
-                    
+
                     with impact_col3:
-                        avg_delta = sum(delta_lcr_list) / len(delta_lcr_list) if delta_lcr_list else 0
                         st.metric("평균 LCR 변동", f"{avg_delta:+.2f}%p",
                                  delta="개선" if avg_delta > 0 else "악화",
                                  delta_color="normal" if avg_delta >= 0 else "inverse")
@@ -5173,9 +5708,12 @@ def main():
                 kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
                 
                 lcr_col = "조정LCR(%)" if "조정LCR(%)" in lcr_input_df.columns else "LCR(%)"
-                
+
+                # LCR 컬럼은 numpy 배열로 한 번만 꺼내 KPI 4개가 공유
+                lcr_arr = lcr_input_df[lcr_col].to_numpy()
+
                 with kpi_col1:
-                    st.metric("D+0 LCR (현재)", f"{lcr_input_df[lcr_col].iloc[0]:.2f}%")
+                    st.metric("D+0 LCR (현재)", f"{lcr_arr[0]:.2f}%")
                 with kpi_col2:
                     d30_idx = min(30, len(lcr_input_df)-1)
                     # D+30에 해당하는 인덱스 찾기
@@ -5183,143 +5721,53 @@ def main():
                     if not d30_match.empty:
                         d30_lcr = d30_match[lcr_col].iloc[0]
                     else:
-                        d30_lcr = lcr_input_df[lcr_col].iloc[d30_idx]
+                        d30_lcr = lcr_arr[d30_idx]
                     st.metric("D+30 LCR", f"{d30_lcr:.2f}%")
                 with kpi_col3:
-                    st.metric("마지막 LCR", f"{lcr_input_df[lcr_col].iloc[-1]:.2f}%",
-                             delta=f"{lcr_input_df[lcr_col].iloc[-1] - lcr_input_df[lcr_col].iloc[0]:.2f}%")
+                    st.metric("마지막 LCR", f"{lcr_arr[-1]:.2f}%",
+                             delta=f"{lcr_arr[-1] - lcr_arr[0]:.2f}%")
                 with kpi_col4:
-                    below_100 = (lcr_input_df[lcr_col] < 100).sum()
-                    st.metric("규제미달 일수", f"{below_100}일", 
+                    below_100 = int(np.count_nonzero(lcr_arr < 100))
+                    st.metric("규제미달 일수", f"{below_100}일",
                              delta="위험" if below_100 > 0 else "안전",
                              delta_color="inverse" if below_100 > 0 else "normal")
                 
                 # LCR 추이 차트
                 st.markdown("#### 📈 LCR 추이 차트")
-                
-                fig_lcr = go.Figure()
-                
-                # 원본 LCR 라인
-                if "원본LCR(%)" in lcr_input_df.columns and use_original_lcr:
-                    fig_lcr.add_trace(go.Scatter(
-                        x=lcr_input_df["일자"],
-                        y=lcr_input_df["원본LCR(%)"],
-                        name="원본 LCR (Excel)",
-                        mode="lines+markers",
-                        line=dict(color="#94a3b8", width=2, dash="dash"),
-                        marker=dict(size=4)
-                    ))
-                
-                # 기본 계산 LCR 라인
-                fig_lcr.add_trace(go.Scatter(
-                    x=lcr_input_df["일자"],
-                    y=lcr_input_df["LCR(%)"],
-                    name="기본 LCR(%)",
-                    mode="lines+markers",
-                    line=dict(color="#3b82f6", width=2),
-                    marker=dict(size=4)
-                ))
-                
-                if "조정LCR(%)" in lcr_input_df.columns:
-                    fig_lcr.add_trace(go.Scatter(
-                        x=lcr_input_df["일자"],
-                        y=lcr_input_df["조정LCR(%)"],
-                        name="조정 LCR (시뮬레이션 반영)",
-                        mode="lines+markers",
-                        line=dict(color="#10b981", width=3),
-                        marker=dict(size=5)
-                    ))
-                
-                # 100% 기준선
-                fig_lcr.add_hline(y=100, line_dash="dash", line_color="red", 
-                                annotation_text="규제 기준 (100%)", 
-                                annotation_position="top right")
-                
-                fig_lcr.update_layout(
-                    title="일자별 LCR 예측 (원본 vs 시뮬레이션 반영)",
-                    xaxis=dict(title="", tickangle=45, tickfont=dict(size=9)),
-                    yaxis=dict(title="LCR(%)", showgrid=True, gridcolor="rgba(0,0,0,0.1)"),
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
-                    height=400,
-                    hovermode="x unified"
-                )
-                
+
+                # 데이터 내용이 같으면 figure 재구성을 건너뜀 (내용 해시 키)
+                lcr_fig_key = pd.util.hash_pandas_object(lcr_input_df, index=False).values.tobytes()
+                fig_lcr, fig_comp = _lcr_trend_figs(lcr_fig_key, lcr_input_df, use_original_lcr)
+
                 st.plotly_chart(fig_lcr, use_container_width=True)
-                
+
                 # 구성요소 차트
                 st.markdown("#### 📊 구성요소 추이")
-                
-                fig_comp = go.Figure()
-                
-                hqla_col = "조정HQLA" if "조정HQLA" in lcr_input_df.columns else "고유동성자산(A)"
-                
-                fig_comp.add_trace(go.Scatter(
-                    x=lcr_input_df["일자"],
-                    y=lcr_input_df[hqla_col],
-                    name="고유동성자산(A)",
-                    mode="lines",
-                    line=dict(color="#10b981", width=2),
-                    fill="tozeroy",
-                    fillcolor="rgba(16, 185, 129, 0.2)"
-                ))
-                
-                fig_comp.add_trace(go.Scatter(
-                    x=lcr_input_df["일자"],
-                    y=lcr_input_df["현금유출(B)"],
-                    name="현금유출(B)",
-                    mode="lines",
-                    line=dict(color="#ef4444", width=2)
-                ))
-                
-                fig_comp.add_trace(go.Scatter(
-                    x=lcr_input_df["일자"],
-                    y=lcr_input_df["현금유입(C)"],
-                    name="현금유입(C)",
-                    mode="lines",
-                    line=dict(color="#f59e0b", width=2)
-                ))
-                
-                fig_comp.add_trace(go.Scatter(
-                    x=lcr_input_df["일자"],
-                    y=lcr_input_df["순유출(B-C)"],
-                    name="순유출(B-C)",
-                    mode="lines",
-                    line=dict(color="#8b5cf6", width=2, dash="dash")
-                ))
-                
-                fig_comp.update_layout(
-                    title="일자별 구성요소 추이",
-                    xaxis=dict(title="", tickangle=45, tickfont=dict(size=9)),
-                    yaxis=dict(title="금액(조)"),
-                    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
-                    height=400,
-                    hovermode="x unified"
-                )
-                
+
                 st.plotly_chart(fig_comp, use_container_width=True)
                 
                 # 데이터 테이블 (가로 형태)
                 st.markdown("#### 📋 기초자료 DATA (가로 형태)")
                 
-                # 가로 형태로 전치
-                display_cols = ["일자", "LCR(%)", "고유동성자산(A)", "현금유출(B)", "현금유입(C)"]
-                if "조정LCR(%)" in lcr_input_df.columns:
-                    display_cols.insert(2, "조정LCR(%)")
-                    display_cols.insert(4, "조정HQLA")
-                if "LCR변동(%)" in lcr_input_df.columns:
-                    display_cols.append("LCR변동(%)")
-                if "원본LCR(%)" in lcr_input_df.columns:
-                    display_cols.insert(1, "원본LCR(%)")
+                # 가로 형태로 전치 — 원하는 순서를 선언해 두고 존재하는 컬럼만 한 번에 선택
+                wanted_cols = ["일자", "원본LCR(%)", "LCR(%)", "조정LCR(%)", "고유동성자산(A)",
+                               "조정HQLA", "현금유출(B)", "현금유입(C)", "LCR변동(%)"]
+                cols_set = set(lcr_input_df.columns)
+                display_cols = [c for c in wanted_cols if c in cols_set]
                 
-                # 존재하는 컬럼만 선택
-                display_cols = [c for c in display_cols if c in lcr_input_df.columns]
-                
-                pivot_df = lcr_input_df[display_cols].set_index("일자").T
-                st.dataframe(pivot_df, use_container_width=True)
+                # 숫자 컬럼만 float32로 전치 — object 업캐스트 없는 동질 블록이라
+                # 전치가 복사 대신 뷰 수준으로 끝나고 직렬화 바이트도 절반
+                pivot_num = lcr_input_df[display_cols].drop(columns=["일자"]).astype(np.float32)
+                pivot_num.index = lcr_input_df["일자"]
+                st.dataframe(pivot_num.T, use_container_width=True)
                 
                 # 다운로드
                 st.markdown("---")
-                csv_lcr = lcr_input_df.to_csv(index=False).encode('utf-8-sig')
+                # BytesIO에 바로 쓰면 전체 문자열 → encode의 2중 피크 메모리를 피한다
+                lcr_buf = BytesIO()
+                lcr_buf.write(b'\xef\xbb\xbf')  # Excel 호환 BOM (utf-8-sig와 동일)
+                lcr_input_df.to_csv(lcr_buf, index=False, encoding='utf-8', chunksize=10_000)
+                csv_lcr = lcr_buf.getvalue()
                 st.download_button(
                     label="📥 LCR 예측 데이터 다운로드 (CSV)",
                     data=csv_lcr,
@@ -5362,59 +5810,47 @@ def main():
             """)
             
             # 금리갭 집계
-            gap_info = calculate_aggregate_rate_gap(positions_f)
+            gap_info = _rate_gap_info(pos_key, positions_f)
             
-            # 요약 KPI 카드
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                gap_3m_조 = gap_info["GAP_3M"] / 1e12
-                color_3m = "#10b981" if gap_3m_조 >= 0 else "#ef4444"
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, {color_3m}22, {color_3m}11); 
+            # 요약 KPI 카드 — 4장을 그리드 하나로 묶어 st.markdown 한 번에 렌더
+            gap_3m_조 = gap_info["GAP_3M"] / 1e12
+            color_3m = "#10b981" if gap_3m_조 >= 0 else "#ef4444"
+            gap_12m_조 = gap_info["GAP_12M"] / 1e12
+            color_12m = "#10b981" if gap_12m_조 >= 0 else "#ef4444"
+            st.markdown(f"""
+            <div style="display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px;">
+                <div style="background: linear-gradient(135deg, {color_3m}22, {color_3m}11);
                             padding: 15px; border-radius: 12px; border-left: 4px solid {color_3m};">
                     <div style="font-size: 12px; color: #666;">3개월 금리갭</div>
                     <div style="font-size: 24px; font-weight: 800; color: {color_3m};">{gap_3m_조:+,.1f}조</div>
                     <div style="font-size: 11px; color: #888;">RSA: {gap_info["RSA_3M"]/1e12:,.1f}조 | RSL: {gap_info["RSL_3M"]/1e12:,.1f}조</div>
                 </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                gap_12m_조 = gap_info["GAP_12M"] / 1e12
-                color_12m = "#10b981" if gap_12m_조 >= 0 else "#ef4444"
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, {color_12m}22, {color_12m}11); 
+                <div style="background: linear-gradient(135deg, {color_12m}22, {color_12m}11);
                             padding: 15px; border-radius: 12px; border-left: 4px solid {color_12m};">
                     <div style="font-size: 12px; color: #666;">12개월 금리갭</div>
                     <div style="font-size: 24px; font-weight: 800; color: {color_12m};">{gap_12m_조:+,.1f}조</div>
                     <div style="font-size: 11px; color: #888;">RSA: {gap_info["RSA_12M"]/1e12:,.1f}조 | RSL: {gap_info["RSL_12M"]/1e12:,.1f}조</div>
                 </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #3b82f622, #3b82f611); 
+                <div style="background: linear-gradient(135deg, #3b82f622, #3b82f611);
                             padding: 15px; border-radius: 12px; border-left: 4px solid #3b82f6;">
                     <div style="font-size: 12px; color: #666;">3M 갭 비율</div>
                     <div style="font-size: 24px; font-weight: 800; color: #3b82f6;">{gap_info["GAP_3M_RATIO"]*100:+,.1f}%</div>
                     <div style="font-size: 11px; color: #888;">총자산 대비</div>
                 </div>
-                """, unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #8b5cf622, #8b5cf611); 
+                <div style="background: linear-gradient(135deg, #8b5cf622, #8b5cf611);
                             padding: 15px; border-radius: 12px; border-left: 4px solid #8b5cf6;">
                     <div style="font-size: 12px; color: #666;">12M 갭 비율</div>
                     <div style="font-size: 24px; font-weight: 800; color: #8b5cf6;">{gap_info["GAP_12M_RATIO"]*100:+,.1f}%</div>
                     <div style="font-size: 11px; color: #888;">총자산 대비</div>
                 </div>
-                """, unsafe_allow_html=True)
+            </div>
+            """, unsafe_allow_html=True)
             
             st.markdown("---")
             
             # 상품별 금리갭 테이블
             st.markdown("#### 📋 상품별 금리민감도")
-            gap_summary = get_rate_gap_summary_table(positions_f)
+            gap_summary = _rate_gap_summary(pos_key, positions_f)
             st.dataframe(
                 gap_summary.style.format({
                     "잔액(조)": "{:,.2f}",
@@ -5429,36 +5865,10 @@ def main():
             # 금리갭 시각화
             st.markdown("#### 📈 금리갭 구조")
             
-            fig_gap = go.Figure()
-            
-            # 3M 갭
-            fig_gap.add_trace(go.Bar(
-                name="RSA (금리민감자산)",
-                x=["3개월", "12개월"],
-                y=[gap_info["RSA_3M"]/1e12, gap_info["RSA_12M"]/1e12],
-                marker_color="#3b82f6",
-                text=[f"{gap_info['RSA_3M']/1e12:,.1f}조", f"{gap_info['RSA_12M']/1e12:,.1f}조"],
-                textposition="outside"
-            ))
-            
-            fig_gap.add_trace(go.Bar(
-                name="RSL (금리민감부채)",
-                x=["3개월", "12개월"],
-                y=[gap_info["RSL_3M"]/1e12, gap_info["RSL_12M"]/1e12],
-                marker_color="#ef4444",
-                text=[f"{gap_info['RSL_3M']/1e12:,.1f}조", f"{gap_info['RSL_12M']/1e12:,.1f}조"],
-                textposition="outside"
-            ))
-            
-            fig_gap.update_layout(
-                title="금리민감 자산/부채 비교",
-                barmode="group",
-                xaxis_title="금리재조정 기간",
-                yaxis_title="금액 (조)",
-                height=400,
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+            fig_gap = _rate_gap_structure_fig(
+                gap_info["RSA_3M"], gap_info["RSA_12M"],
+                gap_info["RSL_3M"], gap_info["RSL_12M"],
             )
-            
             st.plotly_chart(fig_gap, use_container_width=True)
         
         # ==========================================
@@ -5490,41 +5900,34 @@ def main():
                 )
             
             # NII 시뮬레이션 실행
-            nii_result = simulate_nii_impact(positions_f, nii_rate_shock, nii_horizon)
+            nii_result = _nii_impact(pos_key, positions_f, nii_rate_shock, nii_horizon)
             
             # 결과 표시
             st.markdown("---")
             
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #06b6d422, #06b6d411); 
+            # NII KPI 카드 — 3장을 그리드 하나로 묶어 st.markdown 한 번에 렌더
+            impact_color = "#10b981" if nii_result['total_nii_impact'] >= 0 else "#ef4444"
+            impact_sign = "+" if nii_result['total_nii_impact'] >= 0 else ""
+            st.markdown(f"""
+            <div style="display: grid; grid-template-columns: repeat(3, 1fr); gap: 12px;">
+                <div style="background: linear-gradient(135deg, #06b6d422, #06b6d411);
                             padding: 20px; border-radius: 12px; text-align: center;">
                     <div style="font-size: 13px; color: #666;">현재 NII ({nii_horizon}개월)</div>
                     <div style="font-size: 28px; font-weight: 800; color: #0891b2;">{nii_result['current_nii']/1e12:,.2f}조</div>
                 </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                impact_color = "#10b981" if nii_result['total_nii_impact'] >= 0 else "#ef4444"
-                impact_sign = "+" if nii_result['total_nii_impact'] >= 0 else ""
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, {impact_color}22, {impact_color}11); 
+                <div style="background: linear-gradient(135deg, {impact_color}22, {impact_color}11);
                             padding: 20px; border-radius: 12px; text-align: center;">
                     <div style="font-size: 13px; color: #666;">NII 변동 ({nii_rate_shock:+d}bp)</div>
                     <div style="font-size: 28px; font-weight: 800; color: {impact_color};">{impact_sign}{nii_result['total_nii_impact']/1e12:,.2f}조</div>
                     <div style="font-size: 12px; color: #888;">({nii_result['nii_change_pct']:+.1f}%)</div>
                 </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #8b5cf622, #8b5cf611); 
+                <div style="background: linear-gradient(135deg, #8b5cf622, #8b5cf611);
                             padding: 20px; border-radius: 12px; text-align: center;">
                     <div style="font-size: 13px; color: #666;">예상 NII</div>
                     <div style="font-size: 28px; font-weight: 800; color: #7c3aed;">{nii_result['projected_nii']/1e12:,.2f}조</div>
                 </div>
-                """, unsafe_allow_html=True)
+            </div>
+            """, unsafe_allow_html=True)
             
             st.markdown("---")
             
@@ -5543,17 +5946,7 @@ def main():
             
             with col2:
                 # 파이 차트
-                fig_pie = go.Figure(data=[go.Pie(
-                    labels=["3M 갭 영향", "6-12M 갭 영향"],
-                    values=[abs(nii_result['nii_impact_3m']), abs(nii_result['nii_impact_6m_12m'])],
-                    hole=0.4,
-                    marker_colors=["#3b82f6", "#8b5cf6"]
-                )])
-                fig_pie.update_layout(
-                    title="NII 변동 구성",
-                    height=250,
-                    margin=dict(l=20, r=20, t=40, b=20)
-                )
+                fig_pie = _nii_split_pie(nii_result['nii_impact_3m'], nii_result['nii_impact_6m_12m'])
                 st.plotly_chart(fig_pie, use_container_width=True)
             
             # 다양한 금리 시나리오 NII 분석
@@ -5565,27 +5958,12 @@ def main():
                 nii_horizon
             )
             
-            # 차트
-            fig_nii = go.Figure()
-            
-            fig_nii.add_trace(go.Bar(
-                x=nii_scenarios["시나리오"],
-                y=nii_scenarios["NII변동(조)"],
-                marker_color=[
-                    "#ef4444" if v < 0 else "#10b981" 
-                    for v in nii_scenarios["NII변동(조)"]
-                ],
-                text=[f"{v:+.2f}" for v in nii_scenarios["NII변동(조)"]],
-                textposition="outside"
-            ))
-            
-            fig_nii.update_layout(
-                title=f"금리 시나리오별 NII 변동 ({nii_horizon}개월)",
-                xaxis_title="금리 시나리오",
-                yaxis_title="NII 변동 (조)",
-                height=400
+            # 차트 (라벨/값 튜플 키로 figure 캐시)
+            fig_nii = _nii_scenario_fig(
+                tuple(nii_scenarios["시나리오"]),
+                tuple(nii_scenarios["NII변동(조)"]),
+                nii_horizon,
             )
-            
             st.plotly_chart(fig_nii, use_container_width=True)
             
             # 테이블
@@ -5636,35 +6014,19 @@ def main():
             # 시각화
             col1, col2 = st.columns(2)
             
+            scenario_labels = tuple(scenario_results["시나리오"])
+
             with col1:
-                fig_npv = go.Figure()
-                fig_npv.add_trace(go.Bar(
-                    x=scenario_results["시나리오"],
-                    y=scenario_results["NPV(조)"],
-                    name="NPV",
-                    marker_color="#2563eb"
-                ))
-                fig_npv.update_layout(
-                    title="시나리오별 NPV",
-                    xaxis_title="시나리오",
-                    yaxis_title="NPV (조)",
-                    height=350
+                fig_npv = _scenario_bar_fig(
+                    scenario_labels, tuple(scenario_results["NPV(조)"]),
+                    "시나리오별 NPV", "NPV (조)", "#2563eb",
                 )
                 st.plotly_chart(fig_npv, use_container_width=True)
-            
+
             with col2:
-                fig_nii2 = go.Figure()
-                fig_nii2.add_trace(go.Bar(
-                    x=scenario_results["시나리오"],
-                    y=scenario_results["NII(조)"],
-                    name="NII",
-                    marker_color="#10b981"
-                ))
-                fig_nii2.update_layout(
-                    title="시나리오별 NII",
-                    xaxis_title="시나리오",
-                    yaxis_title="NII (조)",
-                    height=350
+                fig_nii2 = _scenario_bar_fig(
+                    scenario_labels, tuple(scenario_results["NII(조)"]),
+                    "시나리오별 NII", "NII (조)", "#10b981",
                 )
                 st.plotly_chart(fig_nii2, use_container_width=True)
         
@@ -5861,43 +6223,47 @@ def main():
                 # 비교표
                 st.markdown("#### 📊 현재 vs 최적 비교")
                 
-                # 안전한 나눗셈 함수
-                def safe_divide(a, b):
-                    if abs(b) < 1e-9:
-                        return 0.0
-                    return (a - b) / abs(b) * 100
-                
+                # 현재/최적 값을 배열로 쌓아 개선율을 한 번에 계산
+                # (스칼라 safe_divide 7회 호출과 .get(..., 1) 기본값 편향 제거)
+                curr_vals = np.array([
+                    behavioral.get('loan_prepay_rate', 0),
+                    behavioral.get('deposit_rollover_rate', 0),
+                    behavioral.get('runoff_rate', 0),
+                    behavioral.get('early_termination', 0),
+                    base_k['NPV'] / 1e9,
+                    base_k['NII_YTD'] / 1e9,
+                    base_k['LCR'],
+                ], dtype=float)
+                opt_vals = np.array([
+                    opt_params.get('loan_prepay_rate', 0),
+                    opt_params.get('deposit_rollover_rate', 0),
+                    opt_params.get('runoff_rate', 0),
+                    opt_params.get('early_termination', 0),
+                    opt_kpi['NPV'] / 1e9,
+                    opt_kpi['NII_YTD'] / 1e9,
+                    opt_kpi['LCR'],
+                ], dtype=float)
+                improvement = np.where(
+                    np.abs(curr_vals) < 1e-9,
+                    0.0,
+                    (opt_vals - curr_vals) / np.where(np.abs(curr_vals) < 1e-9, 1.0, np.abs(curr_vals)) * 100.0,
+                )
+
+                # 숫자 컬럼은 float로 유지하고 표시 포맷은 Styler에 위임
+                # (Arrow 직렬화가 object 대신 float를 전송하고 정렬도 숫자 기준 유지)
                 comparison_df = pd.DataFrame({
                     "지표": ["대출 조기상환율", "예금 재가입률", "유출율", "중도해지율", "NPV(조)", "NII(조)", "LCR"],
-                    "현재": [
-                        f"{behavioral.get('loan_prepay_rate', 0):.4f}",
-                        f"{behavioral.get('deposit_rollover_rate', 0):.4f}",
-                        f"{behavioral.get('runoff_rate', 0):.4f}",
-                        f"{behavioral.get('early_termination', 0):.4f}",
-                        f"{base_k['NPV']/1e9:.2f}",
-                        f"{base_k['NII_YTD']/1e9:.2f}",
-                        f"{base_k['LCR']:.2f}",
-                    ],
-                    "최적": [
-                        f"{opt_params.get('loan_prepay_rate', 0):.4f}",
-                        f"{opt_params.get('deposit_rollover_rate', 0):.4f}",
-                        f"{opt_params.get('runoff_rate', 0):.4f}",
-                        f"{opt_params.get('early_termination', 0):.4f}",
-                        f"{opt_kpi['NPV']/1e9:.2f}",
-                        f"{opt_kpi['NII_YTD']/1e9:.2f}",
-                        f"{opt_kpi['LCR']:.2f}",
-                    ],
-                    "개선율(%)": [
-                        f"{safe_divide(opt_params.get('loan_prepay_rate', 0), behavioral.get('loan_prepay_rate', 1)):.1f}",
-                        f"{safe_divide(opt_params.get('deposit_rollover_rate', 0), behavioral.get('deposit_rollover_rate', 1)):.1f}",
-                        f"{safe_divide(opt_params.get('runoff_rate', 0), behavioral.get('runoff_rate', 1)):.1f}",
-                        f"{safe_divide(opt_params.get('early_termination', 0), behavioral.get('early_termination', 1)):.1f}",
-                        f"{safe_divide(opt_kpi['NPV'], base_k['NPV']):.1f}",
-                        f"{safe_divide(opt_kpi['NII_YTD'], base_k['NII_YTD']):.1f}",
-                        f"{safe_divide(opt_kpi['LCR'], base_k['LCR']):.1f}",
-                    ]
+                    "현재": curr_vals,
+                    "최적": opt_vals,
+                    "개선율(%)": improvement,
                 })
-                st.dataframe(comparison_df, use_container_width=True)
+                st.dataframe(
+                    comparison_df.style
+                    .format({"개선율(%)": "{:.1f}"})
+                    .format("{:.4f}", subset=pd.IndexSlice[:3, ["현재", "최적"]])
+                    .format("{:.2f}", subset=pd.IndexSlice[4:, ["현재", "최적"]]),
+                    use_container_width=True,
+                )
                 
             else:
                 st.error("❌ " + opt_result["message"])
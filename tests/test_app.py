@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from app import _hqla_cash_split, discount_factors_for_dates
+
+
+def test_discount_factors_known_value():
+    """플랫 2% 커브에서 1년 할인계수는 1/1.02 — 알려진 값 회귀 고정."""
+    valuation = pd.Timestamp("2026-01-01")
+    dates = pd.DatetimeIndex([valuation, valuation + pd.Timedelta(days=365)])
+    curve_x = [0.25, 1.0, 5.0, 10.0]
+    curve_y = [0.02, 0.02, 0.02, 0.02]
+
+    df = discount_factors_for_dates(dates, valuation, curve_x, curve_y)
+
+    assert df.iloc[0] == 1.0
+    assert np.isclose(df.iloc[1], 1.0 / 1.02)
+
+
+def test_discount_factors_resolution_independent():
+    """us 해상도 인덱스(pandas 3의 기본 생성 경로)도 ns와 동일해야 한다."""
+    valuation = pd.Timestamp("2026-01-01")
+    dates_ns = pd.date_range("2026-01-01", periods=5, freq="91D")
+    dates_us = dates_ns.as_unit("us")
+    curve_x = [0.25, 1.0, 5.0, 10.0]
+    curve_y = [0.01, 0.015, 0.02, 0.025]
+
+    df_ns = discount_factors_for_dates(dates_ns, valuation, curve_x, curve_y)
+    df_us = discount_factors_for_dates(dates_us, valuation, curve_x, curve_y)
+
+    # 할인계수가 전부 1.0으로 무력화되지 않았는지 함께 확인
+    assert (df_ns.to_numpy()[1:] < 1.0).all()
+    np.testing.assert_allclose(df_ns.to_numpy(), df_us.to_numpy())
+
+
+def test_hqla_cash_split_categorical_product():
+    """로더 출력처럼 product가 카테고리일 때의 현금/기타 분해 스모크."""
+    positions = pd.DataFrame({
+        "type": ["hqla", "hqla", "asset"],
+        "product": ["현금", "국채", "기업대출"],
+        "balance": [1.0e12, 2.0e12, 3.0e12],
+    })
+    positions["type"] = positions["type"].astype("category")
+    positions["product"] = positions["product"].astype("category")
+
+    cash0, hqla_other = _hqla_cash_split("test-key", positions)
+
+    assert cash0 == 1.0e12
+    assert hqla_other == 2.0e12
+